@@ -0,0 +1,387 @@
+import json
+import time
+import zlib
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+
+# Fields whose presence in a mutation response depends on with_notes=true
+_NOTE_FIELDS = {"notes", "comments", "notes_count", "comments_count"}
+
+# Rough per-task cost of the pydantic model, its dict slot and field objects
+_TASK_OVERHEAD_BYTES = 600
+
+
+def _task_bytes(t: Task) -> int:
+    """Approximate in-memory size of one task: fixed overhead plus the variable-length text."""
+    total = _TASK_OVERHEAD_BYTES + len(t.content) + len(t.notes or "")
+    total += sum(len(tag) + 50 for tag in t.tags)
+    total += sum(len(str(c.get("comment", ""))) + 200 for c in t.comments)
+    return total
+
+
+class CachedList:
+    """
+    A cached snapshot of one checklist's tasks, keyed by task id in API order.
+    `version` changes on every patch; `structure_version` only when membership
+    or parent links change. Derived indexes are memoized against those counters;
+    `incremental()` ones are brought up to date from the log of patched task ids.
+    A cold entry can be packed into zlib-compressed JSON; it is unpacked
+    transparently on the next access to `tasks`. The size estimate (nbytes) is kept
+    up to date by every patch, so reading it is O(1).
+    """
+
+    def __init__(self, list_id: int, tasks: Iterable[Task], fetched_at: float):
+        self.list_id = list_id
+        self._tasks: Dict[int, Task] = {t.id: t for t in tasks}
+        self._nbytes = sum(map(_task_bytes, self._tasks.values()))
+        self._packed: Optional[bytes] = None
+        self._packed_count = 0
+        self.fetched_at = fetched_at
+        # Delta-sync state: highest updated_at seen (see sync.timestamp_key) and last full download
+        self.watermark = ""
+        self.full_synced_at = fetched_at
+        # Checklist.change_marker() observed before the last sync
+        self.marker = None
+        self.version = 0
+        self.structure_version = 0
+        self._derived: Dict[str, Tuple[int, Any]] = {}
+        # (version, task id) per patch, oldest first; versions up to _log_floor are not covered
+        self._log: List[Tuple[int, int]] = []
+        self._log_floor = 0
+
+    @property
+    def tasks(self) -> Dict[int, Task]:
+        if self._packed is not None:
+            self.unpack()
+        return self._tasks
+
+    @property
+    def packed(self) -> bool:
+        return self._packed is not None
+
+    def pack(self) -> int:
+        """Replace the Task objects with compressed JSON. Returns the packed size."""
+        if self._packed is None:
+            rows = [t.model_dump(mode="json") for t in self._tasks.values()]
+            self._packed = zlib.compress(json.dumps(rows, separators=(",", ":")).encode())
+            self._packed_count = len(rows)
+            self._tasks = {}
+            self._derived.clear()
+        return len(self._packed)
+
+    def unpack(self):
+        if self._packed is not None:
+            rows = json.loads(zlib.decompress(self._packed))
+            self._tasks = {r["id"]: Task(**r) for r in rows}
+            self._packed = None
+
+    def nbytes(self) -> int:
+        """Approximate memory held by this entry."""
+        if self._packed is not None:
+            return len(self._packed)
+        return self._nbytes
+
+    def task_list(self) -> List[Task]:
+        """Return the tasks as a new list (callers must treat the Task objects as read-only)."""
+        return list(self.tasks.values())
+
+    def upsert(self, task: Task) -> Task:
+        """
+        Write-through patch with a Task returned by a mutation.
+        Fields missing from the response (e.g. notes without with_notes) keep their cached value.
+        """
+        cached = self.tasks.get(task.id)
+        if cached is None:
+            merged = task
+            self.structure_version += 1
+        else:
+            sent = task.model_fields_set
+            if not sent & _NOTE_FIELDS:
+                sent = sent - {"has_notes", "has_comments"}
+            merged = cached.model_copy(update={f: getattr(task, f) for f in sent})
+            if merged.parent_id != cached.parent_id:
+                self.structure_version += 1
+            self._nbytes -= _task_bytes(cached)
+        self._nbytes += _task_bytes(merged)
+        self.tasks[task.id] = merged
+        self._bump(task.id)
+        return merged
+
+    def remove(self, task_id: int) -> Optional[Task]:
+        removed = self.tasks.pop(task_id, None)
+        if removed is not None:
+            self._nbytes -= _task_bytes(removed)
+            self.structure_version += 1
+            self._bump(task_id)
+        return removed
+
+    def reorder(self, order: List[int]) -> bool:
+        """
+        Put the tasks in `order` (every cached id, e.g. the order of a fresh download).
+        A changed order is a structural change: indexes relying on list order are rebuilt.
+        """
+        if list(self.tasks) == order:
+            return False
+        self._tasks = {t_id: self._tasks[t_id] for t_id in order}
+        # Not logged: no task changed, incremental indexes only need the new tree
+        self.version += 1
+        self.structure_version += 1
+        return True
+
+    def add_comment(self, task_id: int, comment: Dict[str, Any]) -> bool:
+        cached = self.tasks.get(task_id)
+        if cached is None:
+            return False
+        updated = self.tasks[task_id] = cached.model_copy(update={
+            "comments": cached.comments + [comment],
+            "comments_count": cached.comments_count + 1,
+            "has_comments": True,
+        })
+        self._nbytes += _task_bytes(updated) - _task_bytes(cached)
+        self._bump(task_id)
+        return True
+
+    def _bump(self, task_id: int):
+        self.version += 1
+        self._log.append((self.version, task_id))
+        if len(self._log) > max(64, len(self._tasks)):
+            # Past this many patches a rebuild is as cheap as replaying them
+            self._log_floor = self.version
+            self._log.clear()
+
+    def changed_since(self, version: int) -> Optional[Set[int]]:
+        """Ids patched after `version`, or None if the log no longer goes back that far."""
+        if version < self._log_floor:
+            return None
+        changed = set()
+        for v, t_id in reversed(self._log):
+            if v <= version:
+                break
+            changed.add(t_id)
+        return changed
+
+    def derived(self, name: str, builder: Callable[["CachedList"], Any], structural: bool = True) -> Any:
+        """
+        Memoize an index computed from this list. Structural indexes survive content-only
+        patches; the others are rebuilt after any patch.
+        """
+        stamp = self.structure_version if structural else self.version
+        hit = self._derived.get(name)
+        if hit is not None and hit[0] == stamp:
+            return hit[1]
+        value = builder(self)
+        self._derived[name] = (stamp, value)
+        return value
+
+    def incremental(self, name: str, builder: Callable[["CachedList"], Any],
+                    updater: Callable[[Any, Set[int]], None]) -> Any:
+        """
+        Like derived(..., structural=False), but a value from an older version is updated in
+        place with `updater(value, changed_ids)` instead of rebuilt, as long as the patch log
+        covers the gap. Dropped with the other indexes when the entry is packed.
+        """
+        hit = self._derived.get(name)
+        if hit is not None and hit[0] == self.version:
+            return hit[1]
+        changed = self.changed_since(hit[0]) if hit is not None else None
+        if changed is None:
+            value = builder(self)
+        else:
+            value = hit[1]
+            updater(value, changed)
+        self._derived[name] = (self.version, value)
+        return value
+
+    def __len__(self) -> int:
+        return self._packed_count if self._packed is not None else len(self._tasks)
+
+
+class ListContentCache:
+    """
+    Read-through cache for checklist contents.
+    - LRU eviction once more than `maxsize` unpinned lists are held.
+    - With `max_bytes`, cold entries are packed and then evicted (LRU or LFU
+      order, see `policy`) until the approximate footprint fits the budget.
+      The most recently used entry is never packed or evicted.
+    - Limits are enforced when entries are added or refreshed (put, touch) and after
+      in-place writes (trim); a hit only updates the LRU/LFU bookkeeping.
+    - Entries older than `ttl` seconds are treated as misses.
+    - Pinned lists are never evicted for size (they still expire by TTL).
+    - `on_remove(list_id)` is called whenever an entry leaves the cache (eviction, pop,
+      clear, or replacement by put), so indexes built over entries can drop it too.
+    """
+
+    def __init__(self, maxsize: int = 10, ttl: float = 30, pinned: Optional[Iterable[int]] = None,
+                 timer: Callable[[], float] = time.monotonic, max_bytes: Optional[int] = None,
+                 policy: str = "lru", on_remove: Optional[Callable[[int], Any]] = None):
+        if policy not in ("lru", "lfu"):
+            raise ValueError(f"Unknown cache policy: {policy}")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.pinned = set(pinned or ())
+        self.timer = timer
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.on_remove = on_remove
+        self._entries: "OrderedDict[int, CachedList]" = OrderedDict()
+        self._uses: Dict[int, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.packs = 0
+
+    def get(self, list_id: int) -> Optional[CachedList]:
+        """
+        Return a fresh entry (and mark it as recently used) or None on miss.
+        Expired entries are kept so they can be delta-synced (see peek()).
+        """
+        entry = self._entries.get(list_id)
+        if entry is None or not self.is_fresh(entry):
+            self.misses += 1
+            return None
+        self._entries.move_to_end(list_id)
+        self._uses[list_id] = self._uses.get(list_id, 0) + 1
+        self.hits += 1
+        return entry
+
+    def is_fresh(self, entry: CachedList) -> bool:
+        return self.timer() - entry.fetched_at < self.ttl
+
+    def peek(self, list_id: int) -> Optional[CachedList]:
+        """Return the entry without touching LRU order, freshness or counters."""
+        return self._entries.get(list_id)
+
+    def put(self, list_id: int, tasks: Iterable[Task]) -> CachedList:
+        entry = CachedList(list_id, tasks, self.timer())
+        if list_id in self._entries:
+            self._removed(list_id)
+        self._entries[list_id] = entry
+        self._entries.move_to_end(list_id)
+        self._uses[list_id] = self._uses.get(list_id, 0) + 1
+        self._evict()
+        return entry
+
+    def touch(self, list_id: int):
+        """Mark an entry as freshly synchronised (after an in-place delta merge)."""
+        entry = self._entries.get(list_id)
+        if entry is not None:
+            entry.fetched_at = self.timer()
+            self._entries.move_to_end(list_id)
+            self._evict()
+
+    def trim(self):
+        """Re-apply the size limits after write-through patches grew an entry in place."""
+        if self.max_bytes is not None:
+            self._evict()
+
+    def pop(self, list_id: int, default=None):
+        self._uses.pop(list_id, None)
+        entry = self._entries.pop(list_id, None)
+        if entry is None:
+            return default
+        self._removed(list_id)
+        return entry
+
+    def clear(self):
+        removed = list(self._entries)
+        self._entries.clear()
+        self._uses.clear()
+        for list_id in removed:
+            self._removed(list_id)
+
+    def _removed(self, list_id: int):
+        if self.on_remove is not None:
+            self.on_remove(list_id)
+
+    def pin(self, list_id: int):
+        self.pinned.add(list_id)
+
+    def unpin(self, list_id: int):
+        self.pinned.discard(list_id)
+        self._evict()
+
+    def nbytes(self) -> int:
+        return sum(entry.nbytes() for entry in self._entries.values())
+
+    def _cold_order(self) -> List[int]:
+        """Ids from coldest to hottest, excluding the most recently used entry."""
+        # OrderedDict iterates least recently used first
+        order = list(self._entries)[:-1]
+        if self.policy == "lfu":
+            order.sort(key=lambda l_id: self._uses.get(l_id, 0))  # stable: ties stay in LRU order
+        return order
+
+    def _drop(self, list_id: int):
+        del self._entries[list_id]
+        self._uses.pop(list_id, None)
+        self.evictions += 1
+        logger.debug(f"List cache: evicted list {list_id}")
+        self._removed(list_id)
+
+    def _evict(self):
+        unpinned = [l_id for l_id in self._cold_order() if l_id not in self.pinned]
+        excess = len(self._entries) - len(self.pinned & self._entries.keys()) - self.maxsize
+        for l_id in unpinned[:max(0, excess)]:
+            self._drop(l_id)
+        if self.max_bytes is None:
+            return
+        total = self.nbytes()
+        if total <= self.max_bytes:
+            return
+        cold = self._cold_order()
+        for l_id in cold:
+            entry = self._entries[l_id]
+            if entry.packed:
+                continue
+            before = entry.nbytes()
+            total += entry.pack() - before
+            self.packs += 1
+            if total <= self.max_bytes:
+                return
+        for l_id in cold:
+            if l_id in self.pinned:
+                continue
+            total -= self._entries[l_id].nbytes()
+            self._drop(l_id)
+            if total <= self.max_bytes:
+                return
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "pinned": len(self.pinned),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "bytes": self.nbytes(),
+            "packed": sum(1 for entry in self._entries.values() if entry.packed),
+            "packs": self.packs,
+        }
+
+    def describe(self) -> List[Dict[str, Any]]:
+        """Per-entry details (coldest first) without unpacking or touching LRU order."""
+        now = self.timer()
+        return [
+            {
+                "list_id": l_id,
+                "tasks": len(entry),
+                "bytes": entry.nbytes(),
+                "age": round(now - entry.fetched_at, 1),
+                "fresh": now - entry.fetched_at < self.ttl,
+                "packed": entry.packed,
+                "pinned": l_id in self.pinned,
+                "uses": self._uses.get(l_id, 0),
+            }
+            for l_id, entry in self._entries.items()
+        ]
+
+    def __contains__(self, list_id: int) -> bool:
+        return list_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
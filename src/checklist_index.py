@@ -0,0 +1,46 @@
+from typing import Dict, Iterable, List, Optional
+from .models import Checklist
+from .trigram import MIN_QUERY, TrigramIndex
+
+
+class ChecklistIndex:
+    """
+    Lookup structures over one /checklists.json snapshot:
+    - id -> Checklist
+    - lowercased name -> Checklist (first in API order)
+    - trigram -> positions (a TrigramIndex), so substring queries only verify candidate names
+      (queries shorter than a trigram scan the names).
+    Matching keeps the case-insensitive `query in name` semantics and API order.
+    """
+
+    def __init__(self, lists: Iterable[Checklist]):
+        # The snapshot object this index was built from (lets callers detect refreshes)
+        self.source = lists
+        self.lists: List[Checklist] = list(lists)
+        self.by_id: Dict[int, Checklist] = {l.id: l for l in self.lists}
+        self.by_name: Dict[str, Checklist] = {}
+        self._names = TrigramIndex()
+        for pos, l in enumerate(self.lists):
+            self.by_name.setdefault(l.name.lower(), l)
+            self._names.add(pos, [l.name])
+
+    def get(self, list_id: int) -> Optional[Checklist]:
+        return self.by_id.get(list_id)
+
+    def find(self, query: str) -> List[Checklist]:
+        """All checklists whose name contains `query` (case-insensitive), in API order."""
+        if len(query) < MIN_QUERY:
+            q = query.lower()
+            return [l for l in self.lists if q in l.name.lower()]
+        return [self.lists[pos] for pos in sorted(self._names.find(query, lambda pos: (self.lists[pos].name,)))]
+
+    def best_match(self, query: str) -> Optional[Checklist]:
+        """Exact (case-insensitive) name match if any, else the first substring match."""
+        exact = self.by_name.get(query.lower())
+        if exact is not None:
+            return exact
+        matches = self.find(query)
+        return matches[0] if matches else None
+
+    def __len__(self) -> int:
+        return len(self.lists)
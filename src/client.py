@@ -14,6 +14,7 @@ from src.exceptions import (
     CheckvistPartialSuccessError
 )
 from src.models import Task, Checklist, Comment
+from src.hierarchy import BreadcrumbIndex
 
 class CheckvistClient:
     BASE_URL = "https://checkvist.com"
@@ -99,6 +100,12 @@ class CheckvistClient:
             raise CheckvistAPIError(f"Unexpected API response type for task: {type(data)}. Content: {str(data)[:100]}")
         return Task(**data)
 
+    def _to_tasks(self, data: Any) -> List[Task]:
+        """Like _to_task, but keeps every task of a list response (e.g. subtasks closed with their parent)."""
+        if isinstance(data, list) and data:
+            return [self._to_task(item) for item in data]
+        return [self._to_task(data)]
+
     async def authenticate(self) -> bool:
         """ Authenticate with Checkvist and get a token. """
         try:
@@ -132,9 +139,14 @@ class CheckvistClient:
 
     async def get_tasks(self, list_id: int) -> List[Task]:
         """ Get all tasks in a checklist with notes and tags. """
+        data = await self.get_tasks_raw(list_id)
+        return [Task(**t) for t in data]
+
+    async def get_tasks_raw(self, list_id: int) -> List[Dict[str, Any]]:
+        """ Get all tasks in a checklist as raw dicts (used by delta sync to skip parsing unchanged rows). """
         params = {"with_notes": "true", "with_tags": "true"}
         data = await self._handle_request("GET", f"/checklists/{list_id}/tasks.json", params=params)
-        return [Task(**t) for t in data]
+        return data if isinstance(data, list) else []
 
     async def create_checklist(self, name: str, public: bool = False) -> Checklist:
         """ Create a new checklist. """
@@ -158,15 +170,15 @@ class CheckvistClient:
         res = await self._handle_request("POST", f"/checklists/{list_id}/tasks.json", data=data)
         return self._to_task(res)
 
-    async def close_task(self, list_id: int, task_id: int) -> Task:
-        """ Mark a task as closed. """
+    async def close_task(self, list_id: int, task_id: int) -> List[Task]:
+        """ Mark a task as closed. Returns the task first, then any subtasks whose status changed with it. """
         res = await self._handle_request("POST", f"/checklists/{list_id}/tasks/{task_id}/close.json")
-        return self._to_task(res)
+        return self._to_tasks(res)
 
-    async def reopen_task(self, list_id: int, task_id: int) -> Task:
-        """ Reopen a closed task. """
+    async def reopen_task(self, list_id: int, task_id: int) -> List[Task]:
+        """ Reopen a closed task. Returns the task first, then any subtasks reopened with it. """
         res = await self._handle_request("POST", f"/checklists/{list_id}/tasks/{task_id}/reopen.json")
-        return self._to_task(res)
+        return self._to_tasks(res)
 
     async def get_task(self, list_id: int, task_id: int) -> Task:
         """ Get a specific task with notes and tags. """
@@ -188,18 +200,7 @@ class CheckvistClient:
         if task_id not in task_map:
             raise ValueError(f"Task {task_id} not found in list {list_id}")
             
-        breadcrumbs = []
-        current = task_map[task_id]
-        
-        while current:
-            breadcrumbs.insert(0, current.content)
-            parent_id = current.parent_id
-            if parent_id and parent_id in task_map:
-                current = task_map[parent_id]
-            else:
-                current = None
-                
-        return " > ".join(breadcrumbs)
+        return BreadcrumbIndex(task_map).path(task_id)
 
     async def move_task(self, list_id: int, task_id: int, parent_id: int) -> Task:
         """ Move a task to a new parent within the same list. """
@@ -0,0 +1,64 @@
+from typing import Any, Dict, Iterable, List, Optional
+from .models import Task
+
+# Task fields whose changes are reported as edits (parent and status have their own buckets)
+EDIT_FIELDS = ("content", "notes", "priority", "due_date", "tags")
+
+# A snapshot is the comparable state of a list: task id -> {field: value}, in list order
+Snapshot = Dict[int, Dict[str, Any]]
+
+
+def snapshot(tasks: Iterable[Task]) -> Snapshot:
+    return {
+        t.id: {
+            "content": t.content,
+            "parent_id": t.parent_id or None,  # 0 means root (BUG-003)
+            "status": t.status,
+            "notes": t.notes,
+            "priority": t.priority or 0,
+            "due_date": t.due_date,
+            "tags": sorted(t.tags),
+        }
+        for t in tasks
+    }
+
+
+def diff_snapshots(old: Snapshot, new: Snapshot,
+                   candidates: Optional[Iterable[int]] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Changes from `old` to `new` in one pass over each (id-keyed lookups only, O(n)).
+    Buckets: added, removed, moved (parent changed), edited (EDIT_FIELDS, as [old, new]),
+    closed and reopened. A task can be in several of moved/edited/closed/reopened.
+    `candidates` (e.g. from MerkleIndex.changed) limits the comparison to those ids of
+    `new`; removals are still found from the id sets.
+    """
+    changes: Dict[str, List[Dict[str, Any]]] = {
+        "added": [], "removed": [], "moved": [], "edited": [], "closed": [], "reopened": [],
+    }
+    compared = new.items() if candidates is None else ((t_id, new[t_id]) for t_id in candidates if t_id in new)
+    for t_id, now in compared:
+        before = old.get(t_id)
+        if before is None:
+            changes["added"].append({"id": t_id, "content": now["content"], "parent_id": now["parent_id"]})
+            continue
+        if before == now:
+            continue
+        if before["parent_id"] != now["parent_id"]:
+            changes["moved"].append({
+                "id": t_id, "content": now["content"], "from": before["parent_id"], "to": now["parent_id"],
+            })
+        fields = {f: [before[f], now[f]] for f in EDIT_FIELDS if before[f] != now[f]}
+        if fields:
+            changes["edited"].append({"id": t_id, "content": now["content"], "fields": fields})
+        if before["status"] != 1 and now["status"] == 1:
+            changes["closed"].append({"id": t_id, "content": now["content"]})
+        elif before["status"] == 1 and now["status"] == 0:
+            changes["reopened"].append({"id": t_id, "content": now["content"]})
+    for t_id, before in old.items():
+        if t_id not in new:
+            changes["removed"].append({"id": t_id, "content": before["content"]})
+    return changes
+
+
+def count_changes(changes: Dict[str, List[Dict[str, Any]]]) -> int:
+    return sum(len(bucket) for bucket in changes.values())
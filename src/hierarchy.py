@@ -0,0 +1,229 @@
+import heapq
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from .models import Task
+
+
+class TreeIndex:
+    """
+    Hierarchy of one list, built in a single pass and memoized per structure version
+    (see CachedList.derived). Everything is keyed by task id and kept in API order.
+
+    - `children`: parent id -> child ids (also for parents missing from the list)
+    - `roots`: tasks without a parent (parent_id None/0)
+    - `orphan_roots`: tasks whose parent is not in the list (e.g. archived or moved)
+    - `orphans`: every task not reachable from a root (orphan subtrees and parent cycles)
+    - `pre` / `post` / `depth` / `size`: preorder and postorder numbers, depth and subtree
+      size (including the node). Defined for every task reachable from a root or an orphan
+      root; depth restarts at 0 under an orphan root. Tasks caught in a parent cycle have
+      no numbering.
+    - `preorder`: ids in preorder; the subtree of `t` is `preorder[pre[t]:pre[t] + size[t]]`.
+    - `cycles`: tasks caught in a parent cycle (unnumbered), sorted by id
+    """
+
+    def __init__(self, tasks: Iterable[Task]):
+        self.parent: Dict[int, Optional[int]] = {}
+        self.children: Dict[int, List[int]] = {}
+        self.roots: List[int] = []
+        for t in tasks:
+            pid = t.parent_id or None  # Normalize root detection (BUG-003: 0 means root)
+            self.parent[t.id] = pid
+            if pid is None:
+                self.roots.append(t.id)
+            else:
+                self.children.setdefault(pid, []).append(t.id)
+        self.orphan_roots = [t_id for t_id, pid in self.parent.items() if pid is not None and pid not in self.parent]
+
+        self.pre: Dict[int, int] = {}
+        self.post: Dict[int, int] = {}
+        self.depth: Dict[int, int] = {}
+        self.size: Dict[int, int] = {}
+        self.preorder: List[int] = []
+        self.postorder: List[int] = []
+        for top in self.roots:
+            self._number(top)
+        # preorder[:rooted] is the tree as shown by get_tree; orphan subtrees follow
+        self.rooted = len(self.preorder)
+        for top in self.orphan_roots:
+            self._number(top)
+        self.cycles: List[int] = sorted(self.parent.keys() - self.pre.keys())
+        self.orphans: Set[int] = set(self.preorder[self.rooted:]) | set(self.cycles)
+        self._tops = [t_id for t_id, pid in self.parent.items() if pid is None or pid not in self.parent]
+
+    def _number(self, top: int):
+        """Iterative DFS assigning pre/post numbers, depth and subtree size under `top`."""
+        self.pre[top] = len(self.preorder)
+        self.preorder.append(top)
+        self.depth[top] = 0
+        stack = [(top, iter(self.children.get(top, ())))]
+        while stack:
+            node, pending = stack[-1]
+            child = next(pending, None)
+            if child is None:
+                stack.pop()
+                self.size[node] = len(self.preorder) - self.pre[node]
+                self.post[node] = len(self.postorder)
+                self.postorder.append(node)
+                continue
+            self.pre[child] = len(self.preorder)
+            self.preorder.append(child)
+            self.depth[child] = self.depth[node] + 1
+            stack.append((child, iter(self.children.get(child, ()))))
+
+    def tops(self) -> List[int]:
+        """Roots and orphan roots in API order (the starts of every numbered subtree). Shared: do not mutate."""
+        return self._tops
+
+    def subtree(self, task_id: int) -> List[int]:
+        """The task and all its descendants in preorder: a slice of `preorder`, O(subtree)."""
+        start = self.pre.get(task_id)
+        if start is None:
+            # Parent cycle (or unknown id): no interval, fall back to a guarded walk
+            return [t_id for t_id, _ in self.walk([task_id])] if task_id in self.parent else []
+        return self.preorder[start:start + self.size[task_id]]
+
+    def descendants(self, task_id: int) -> List[int]:
+        return self.subtree(task_id)[1:]
+
+    def page(self, start: int, count: int, max_depth: Optional[int] = None,
+             hidden: Optional[Callable[[int], bool]] = None,
+             root: Optional[int] = None) -> Tuple[List[int], Optional[int]]:
+        """
+        Up to `count` visible ids of the rooted preorder from position `start`, plus the position
+        of the next visible id (None at the end). A hidden or too-deep node is skipped together
+        with its subtree in one jump, so a page costs O(count + skipped subtrees), not O(list).
+        With `root`, only that task's subtree interval is paged and `max_depth` is relative to it
+        (see `level`). Raises KeyError for a root without numbering (unknown or in a cycle).
+        """
+        if root is None:
+            lo, hi, base = 0, self.rooted, 0
+        else:
+            lo = self.pre[root]
+            hi, base = lo + self.size[root], self.depth[root]
+        limit = None if max_depth is None else base + max_depth
+        ids: List[int] = []
+        position = self._next_visible(max(start, lo), hi, limit, hidden)
+        while position is not None and len(ids) < count:
+            ids.append(self.preorder[position])
+            position = self._next_visible(position + 1, hi, limit, hidden)
+        return ids, position
+
+    def level(self, task_id: int, root: Optional[int] = None) -> int:
+        """Depth of a numbered task, relative to `root` when given."""
+        return self.depth[task_id] - (self.depth[root] if root is not None else 0)
+
+    def _next_visible(self, position: int, end: int, max_depth: Optional[int],
+                      hidden: Optional[Callable[[int], bool]]) -> Optional[int]:
+        while position < end:
+            t_id = self.preorder[position]
+            if (max_depth is not None and self.depth[t_id] > max_depth) or (hidden is not None and hidden(t_id)):
+                position += self.size[t_id]
+                continue
+            return position
+        return None
+
+    def expand(self, starts: Iterable[int], budget: int, cost: Callable[[int, int, int], int],
+               rank: Optional[Callable[[int], Any]] = None,
+               hidden: Optional[Callable[[int], bool]] = None) -> Tuple[List[int], Set[int], int]:
+        """
+        Plan an outline that fits `budget`. `cost(id, level, folded)` is the size of a task's
+        line when `folded` of its children are collapsed into it (0 once expanded).
+        The starts are shown in order while they fit; then nodes are expanded breadth-first,
+        by `rank` (lowest first) within a level, revealing all their visible children at once.
+        A node whose children do not fit stays folded and smaller siblings may still expand.
+        Returns (shown starts, expanded ids, size used).
+        """
+        visible: Dict[int, List[int]] = {}
+
+        def kids(t_id: int) -> List[int]:
+            if t_id not in visible:
+                visible[t_id] = [c for c in self.children.get(t_id, ()) if hidden is None or not hidden(c)]
+            return visible[t_id]
+
+        used = 0
+        shown: List[int] = []
+        heap: List[Tuple[int, Any, int, int]] = []
+        seen: Set[int] = set()  # only matters for tasks caught in a parent cycle
+        for t_id in starts:
+            if t_id in seen or (hidden is not None and hidden(t_id)):
+                continue
+            line = cost(t_id, 0, len(kids(t_id)))
+            if used + line > budget:
+                break
+            used += line
+            seen.add(t_id)
+            shown.append(t_id)
+            heap.append((0, rank(t_id) if rank else 0, len(heap), t_id))
+        heapq.heapify(heap)
+
+        expanded: Set[int] = set()
+        while heap:
+            level, _, _, t_id = heapq.heappop(heap)
+            children = [c for c in kids(t_id) if c not in seen]
+            if not children:
+                continue
+            delta = cost(t_id, level, 0) - cost(t_id, level, len(kids(t_id)))
+            delta += sum(cost(c, level + 1, len(kids(c))) for c in children)
+            if used + delta > budget:
+                continue
+            used += delta
+            expanded.add(t_id)
+            for c in children:
+                seen.add(c)
+                heapq.heappush(heap, (level + 1, rank(c) if rank else 0, self.pre.get(c, 0), c))
+        return shown, expanded, used
+
+    def walk(self, starts: Iterable[int], max_depth: Optional[int] = None,
+             prune: Optional[Callable[[int], bool]] = None) -> Iterator[Tuple[int, int]]:
+        """
+        Yield (task_id, level) in preorder below each start (level 0 = the start itself).
+        Nodes deeper than `max_depth` are not visited; a node for which `prune(id)` is true
+        is skipped together with its subtree. Runs in time proportional to what it yields.
+        """
+        stack = [(t_id, 0) for t_id in reversed(list(starts))]
+        seen: Set[int] = set()  # only matters for tasks caught in a parent cycle
+        while stack:
+            t_id, level = stack.pop()
+            if t_id in seen or (prune is not None and prune(t_id)):
+                continue
+            seen.add(t_id)
+            yield t_id, level
+            if max_depth is None or level < max_depth:
+                stack.extend((c_id, level + 1) for c_id in reversed(self.children.get(t_id, ())))
+
+    def __contains__(self, task_id: int) -> bool:
+        return task_id in self.parent
+
+    def __len__(self) -> int:
+        return len(self.parent)
+
+
+class BreadcrumbIndex:
+    """
+    Memoized "A > B > C" paths for the tasks of one list. A path is built from its
+    parent's memoized path, so siblings share the prefix work and rendering every
+    breadcrumb of a list is linear in the output. The walk stops at a parent missing
+    from the list and is guarded against parent cycles. Memoize it per list version
+    (content edits change paths), see CachedList.derived(..., structural=False).
+    """
+
+    def __init__(self, tasks: Dict[int, Task]):
+        self.tasks = tasks
+        self._paths: Dict[int, str] = {}
+
+    def path(self, task_id: int) -> str:
+        cached = self._paths.get(task_id)
+        if cached is not None:
+            return cached
+        pending = []
+        seen: Set[int] = set()
+        current = task_id
+        while current in self.tasks and current not in self._paths and current not in seen:
+            seen.add(current)
+            pending.append(current)
+            current = self.tasks[current].parent_id
+        prefix = self._paths.get(current) if current not in seen else None
+        for t_id in reversed(pending):
+            content = self.tasks[t_id].content
+            prefix = f"{prefix} > {content}" if prefix is not None else content
+            self._paths[t_id] = prefix
+        return self._paths.get(task_id, "")
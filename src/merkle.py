@@ -0,0 +1,116 @@
+import hashlib
+from typing import Dict, Iterable, List, Set
+from .hierarchy import TreeIndex
+from .models import Task
+
+# Top-level subtrees are hashed in chunks of this many, and the root over the chunk digests
+_CHUNK = 64
+
+
+def _digest(*parts: bytes) -> bytes:
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part)
+    return h.digest()
+
+
+def task_hash(task: Task) -> bytes:
+    """Hash of one task's own content and metadata (every field, children excluded)."""
+    return _digest(task.model_dump_json().encode())
+
+
+class MerkleIndex:
+    """
+    Merkle hashes over a list's hierarchy: `own[t]` hashes the task itself and
+    `subtree[t]` combines it with its children's subtree hashes in list order, so two
+    versions of a branch are equal iff their subtree hashes are. `root` covers the whole
+    list: the top-level subtrees, hashed in fixed-size chunks, plus tasks caught in
+    parent cycles.
+
+    Kept up to date incrementally (see CachedList.incremental): a content patch rehashes
+    the task, its ancestors and the one chunk holding its top-level task; a structural
+    change reuses every unchanged own hash.
+    """
+
+    def __init__(self, tree: TreeIndex, tasks: Dict[int, Task]):
+        self.tree = tree
+        self.own: Dict[int, bytes] = {t_id: task_hash(t) for t_id, t in tasks.items()}
+        self.subtree: Dict[int, bytes] = {}
+        self._rehash_all()
+
+    def _combine(self, t_id: int) -> bytes:
+        children = self.tree.children.get(t_id, ())
+        return _digest(self.own[t_id], *(self.subtree[c] for c in children if c in self.subtree))
+
+    def _rehash_all(self):
+        self.subtree = {}
+        for t_id in self.tree.postorder:
+            self.subtree[t_id] = self._combine(t_id)
+        tops = self.tree.tops()
+        # Depends on the tree only, so it is shared by copies
+        self._chunk_of: Dict[int, int] = {t_id: i // _CHUNK for i, t_id in enumerate(tops)}
+        self.chunks: List[bytes] = [self._hash_chunk(i) for i in range(0, len(tops), _CHUNK)]
+        self._rehash_root()
+
+    def _hash_chunk(self, start: int) -> bytes:
+        return _digest(*(self.subtree[t_id] for t_id in self.tree.tops()[start:start + _CHUNK]))
+
+    def _rehash_root(self):
+        self.root = _digest(*self.chunks, *(self.own[t_id] for t_id in self.tree.cycles))
+
+    def update(self, tree: TreeIndex, tasks: Dict[int, Task], changed: Iterable[int]):
+        """Apply patches to `changed` task ids; `tree` is the list's current TreeIndex."""
+        for t_id in changed:
+            if t_id in tasks:
+                self.own[t_id] = task_hash(tasks[t_id])
+            else:
+                self.own.pop(t_id, None)
+        if tree is not self.tree:
+            # Parent links or membership changed: own hashes are reused, subtrees recombined
+            self.tree = tree
+            self._rehash_all()
+            return
+        dirty: Set[int] = set()
+        for t_id in changed:
+            while t_id is not None and t_id in tree.pre and t_id not in dirty:
+                dirty.add(t_id)
+                t_id = tree.parent.get(t_id)
+        # Children before parents
+        for t_id in sorted(dirty, key=tree.post.__getitem__):
+            self.subtree[t_id] = self._combine(t_id)
+        for chunk in {self._chunk_of[t_id] for t_id in dirty if t_id in self._chunk_of}:
+            self.chunks[chunk] = self._hash_chunk(chunk * _CHUNK)
+        self._rehash_root()
+
+    def copy(self) -> "MerkleIndex":
+        """Frozen copy (TreeIndex objects are never mutated, so the tree is shared)."""
+        clone = MerkleIndex.__new__(MerkleIndex)
+        clone.tree, clone.own, clone.subtree, clone.root = self.tree, dict(self.own), dict(self.subtree), self.root
+        clone._chunk_of, clone.chunks = self._chunk_of, list(self.chunks)
+        return clone
+
+    def changed(self, other: "MerkleIndex") -> List[int]:
+        """
+        Ids of tasks that differ from `other` (own hash changed, or absent there), found
+        top-down: a subtree whose hash matches is skipped whole, so the cost follows the
+        changed region rather than the list size. Against the same tree, only the tops of
+        chunks whose digest differs are visited.
+        """
+        if self.root == other.root:
+            return []
+        result = []
+        tops = self.tree.tops()
+        if other.tree is self.tree:
+            tops = [t_id for i, chunk in enumerate(self.chunks) if chunk != other.chunks[i]
+                    for t_id in tops[i * _CHUNK:(i + 1) * _CHUNK]]
+        stack = list(reversed(tops))
+        while stack:
+            t_id = stack.pop()
+            if other.subtree.get(t_id) == self.subtree.get(t_id):
+                continue
+            if other.own.get(t_id) != self.own[t_id]:
+                result.append(t_id)
+            stack.extend(reversed(self.tree.children.get(t_id, ())))
+        # Tasks caught in a parent cycle are outside every subtree
+        result.extend(t_id for t_id in self.tree.cycles if other.own.get(t_id) != self.own[t_id])
+        return result
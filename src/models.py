@@ -80,6 +80,16 @@ class Checklist(BaseModel):
     id: int
     name: str
     public: bool = False
+    # List-level change markers returned by /checklists.json
+    updated_at: Optional[str] = None
+    task_count: Optional[int] = None
+    task_completed: Optional[int] = None
+
+    def change_marker(self) -> Optional[tuple]:
+        """ Cheap fingerprint of the list contents; None when the API sent no stats. """
+        if self.updated_at is None and self.task_count is None:
+            return None
+        return (self.updated_at, self.task_count, self.task_completed)
 
 class Comment(BaseModel):
     id: int
@@ -0,0 +1,96 @@
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+# Same value as server.ARCHIVE_TAG: logically deleted tasks keep their tag but never show it
+HIDDEN_TAGS = ("deleted",)
+
+# Rough size of a token in rendered outline text, for token budgets
+CHARS_PER_TOKEN = 4
+
+
+def flatten(nodes: Iterable[Dict[str, Any]], max_level: Optional[int] = None) -> Iterator[Tuple[Dict[str, Any], int]]:
+    """
+    Yield (task_dict, level) in preorder from nested {'data', 'children'} nodes without
+    recursion, so neither depth nor width can exhaust the stack.
+    """
+    stack = [(node, 0) for node in reversed(list(nodes))]
+    while stack:
+        node, level = stack.pop()
+        yield node["data"], level
+        if max_level is None or level < max_level:
+            stack.extend((child, level + 1) for child in reversed(node["children"]))
+
+
+def task_line(task: Dict[str, Any], level: int, status: bool = True, meta: bool = True, folded: int = 0) -> str:
+    """
+    One outline line: `- [x] content !p ^due #tag (ID: n)` indented two spaces per level,
+    followed by `[F: n]` when n children are collapsed into it.
+    """
+    parts = ["  " * level, "- "]
+    if status:
+        parts.append("[x] " if task.get("status", 0) == 1 else "[ ] ")
+    parts.append(task.get("content", "No content"))
+    if meta:
+        priority = task.get("priority") or 0
+        if priority > 0:
+            parts.append(f" !{priority}")
+        if task.get("due_date"):
+            parts.append(f" ^{task['due_date']}")
+        for tag in task.get("tags", []):
+            if tag not in HIDDEN_TAGS:
+                parts.append(f" #{tag}")
+    parts.append(f" (ID: {task.get('id')})")
+    if folded:
+        parts.append(f" [F: {folded}]")
+    return "".join(parts)
+
+
+def iter_tree_lines(nodes: Iterable[Dict[str, Any]], max_level: Optional[int] = None,
+                    status: bool = True, meta: bool = True) -> Iterator[str]:
+    """Chunk generator over a rendered tree (one line per task, no trailing newline)."""
+    for task, level in flatten(nodes, max_level):
+        yield task_line(task, level, status=status, meta=meta)
+
+
+def render_tree(nodes: Iterable[Dict[str, Any]], max_level: Optional[int] = None,
+                status: bool = True, meta: bool = True) -> str:
+    """Render a whole tree into one buffer (a single join, no repeated concatenation)."""
+    return "\n".join(iter_tree_lines(nodes, max_level, status=status, meta=meta))
+
+
+# --- Chunk pipeline ---
+# Resources are built as generators of string chunks (tasks -> lines -> separators -> envelope)
+# and materialized by a single "".join at the boundary, instead of a rendered body, a wrapped
+# copy and a prefixed copy of the same text.
+
+def join_lines(lines: Iterable[str]) -> Iterator[str]:
+    """Chunk generator equivalent of "\n".join(lines)."""
+    first = True
+    for line in lines:
+        if not first:
+            yield "\n"
+        first = False
+        yield line
+
+
+def wrap_chunks(chunks: Iterable[str]) -> Iterator[str]:
+    """Chunk generator equivalent of server.wrap_data (the `<user_data>` envelope)."""
+    yield "<user_data>\n"
+    yield from chunks
+    yield "\n</user_data>"
+
+
+def iter_flat_lines(tasks: Iterable[Any], path: Callable[[int], str]) -> Iterator[str]:
+    """`- [x] A > B > C (ID: n)` for each task, with its breadcrumb `path(id)`."""
+    for t in tasks:
+        yield f"- [{'x' if t.status == 1 else ' '}] {path(t.id)} (ID: {t.id})"
+
+
+def iter_due_lines(tasks: Iterable[Any], list_name: Callable[[Optional[int]], str]) -> Iterator[str]:
+    """Agenda lines for tasks sorted by due date, with a `## date` heading per day."""
+    yield "# Upcoming Due Tasks"
+    current_date = None
+    for t in tasks:
+        if t.due_date != current_date:
+            current_date = t.due_date
+            yield f"\n## {current_date}"
+        yield f"- {t.content} [{list_name(t.checklist_id)}] (ID: {t.id})"
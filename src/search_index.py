@@ -0,0 +1,217 @@
+import bisect
+import re
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from .cache import CachedList
+from .models import Task
+from .trigram import TrigramIndex
+
+_WORD = re.compile(r"\w+")
+
+# (list id, task id)
+Posting = Tuple[int, int]
+
+# Rough per-task cost of the number <-> task id maps (see TaskSearchIndex.nbytes)
+_TASK_OVERHEAD_BYTES = 200
+
+# Dead numbers are purged from the postings once they outnumber the live ones (and this)
+_COMPACT_MIN = 4096
+
+
+def words(text: str) -> Set[str]:
+    return set(_WORD.findall(text.lower()))
+
+
+def task_words(task: Task) -> Set[str]:
+    """Index terms of a task: the words of its content and of its tags."""
+    terms = words(task.content)
+    for tag in task.tags:
+        terms |= words(tag)
+    return terms
+
+
+class TaskSearchIndex:
+    """
+    Inverted index word -> tasks over the task content and tags of the cached lists. A
+    query word matches every indexed word it is a prefix of (a bisect over the sorted
+    vocabulary) and a task must match all query words, in any order. A trigram index over
+    the same fields adds plain substring matches, so fragments starting mid-word ("board"
+    for "onboarding") are found too; queries shorter than a trigram use the words only.
+
+    Every indexed task version gets a number, and both indexes store compact arrays of
+    numbers rather than task text: substring candidates are verified against the cached
+    tasks passed to search(). Postings are append-only. A patched task is indexed under a
+    new number and its old one dies; dead numbers are purged once they outnumber the live.
+
+    Each list is indexed at the version it was built from and brought up to date from the
+    entry's patch log (write-through patches and delta syncs both go through it), or
+    rebuilt when the log does not reach back. Only the version and task numbers are kept,
+    never the entry: the owner must call remove_list() when an entry is dropped or
+    replaced (see ListContentCache.on_remove), so evicted lists do not stay indexed.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, array] = {}
+        self._vocab: List[str] = []  # sorted keys of `postings`
+        self.substrings = TrigramIndex()
+        self._owner: Dict[int, Posting] = {}  # live number -> (list id, task id)
+        self._lists: Dict[int, Tuple[int, Dict[int, int]]] = {}  # version, task id -> number
+        self._building: Dict[int, object] = {}  # list id -> token of the build in progress
+        self._next = 0
+        self._dead = 0
+
+    def can_refresh(self, entry: CachedList) -> bool:
+        """True when refresh() is incremental: the list is indexed and its patch log reaches back."""
+        state = self._lists.get(entry.list_id)
+        return state is not None and (state[0] == entry.version or entry.changed_since(state[0]) is not None)
+
+    def refresh(self, entry: CachedList):
+        if not self.can_refresh(entry):
+            for _ in self.build(entry):
+                pass
+            return
+        version, numbers = self._lists[entry.list_id]
+        if version == entry.version:
+            return
+        for t_id in entry.changed_since(version):
+            self._drop(numbers.pop(t_id, None))
+            task = entry.tasks.get(t_id)
+            if task is not None:
+                numbers[t_id] = self._add(entry.list_id, t_id, task)
+        self._lists[entry.list_id] = (entry.version, numbers)
+        self._maybe_compact()
+
+    def build(self, entry: CachedList, batch: int = 500) -> Iterator[None]:
+        """
+        (Re)index a whole list, yielding every `batch` tasks so callers can spread the work.
+        The new postings replace the old ones only once complete; a remove_list() or a
+        newer build of the same list meanwhile abandons this one.
+        """
+        list_id = entry.list_id
+        token = self._building[list_id] = object()
+        version = entry.version
+        items = list(entry.tasks.items())
+        numbers: Dict[int, int] = {}
+        done = False
+        try:
+            for start in range(0, len(items), batch):
+                if start:
+                    yield
+                    if self._building.get(list_id) is not token:
+                        return
+                for t_id, task in items[start:start + batch]:
+                    numbers[t_id] = self._add(None, t_id, task)
+            done = True
+        finally:
+            if not done:
+                # Abandoned, or closed early (e.g. its background task was cancelled)
+                self._dead += len(numbers)
+                if self._building.get(list_id) is token:
+                    del self._building[list_id]
+        del self._building[list_id]
+        self._forget(list_id)
+        for t_id, number in numbers.items():
+            self._owner[number] = (list_id, t_id)
+        self._lists[list_id] = (version, numbers)
+        self._maybe_compact()
+
+    def remove_list(self, list_id: int):
+        self._building.pop(list_id, None)
+        self._forget(list_id)
+        self._maybe_compact()
+
+    def _forget(self, list_id: int):
+        state = self._lists.pop(list_id, None)
+        if state is not None:
+            for number in state[1].values():
+                self._drop(number)
+
+    def _add(self, list_id: Optional[int], t_id: int, task: Task) -> int:
+        """Index one task under a new number, live at once unless `list_id` is None."""
+        number = self._next
+        self._next += 1
+        postings = self.postings
+        for term in task_words(task):
+            try:
+                postings[term].append(number)
+            except KeyError:
+                postings[term] = array("q", (number,))
+                bisect.insort(self._vocab, term)
+        self.substrings.add(number, [task.content, *task.tags])
+        if list_id is not None:
+            self._owner[number] = (list_id, t_id)
+        return number
+
+    def _drop(self, number: Optional[int]):
+        if number is not None and self._owner.pop(number, None) is not None:
+            self._dead += 1
+
+    def _maybe_compact(self):
+        # Numbers of a build in progress are not live yet: wait until it is done
+        if self._building or self._dead <= max(_COMPACT_MIN, len(self._owner)):
+            return
+        live = self._owner
+        for term in list(self.postings):
+            hits = array("q", (number for number in self.postings[term] if number in live))
+            if hits:
+                self.postings[term] = hits
+            else:
+                del self.postings[term]
+        self._vocab = sorted(self.postings)
+        self.substrings.compact(live)
+        self._dead = 0
+
+    def _prefixed(self, prefix: str) -> Set[int]:
+        found: Set[int] = set()
+        i = bisect.bisect_left(self._vocab, prefix)
+        while i < len(self._vocab) and self._vocab[i].startswith(prefix):
+            found.update(self.postings[self._vocab[i]])
+            i += 1
+        return found
+
+    def search(self, query: str, entries: Dict[int, CachedList]) -> Optional[Set[Posting]]:
+        """
+        (list id, task id) pairs of the lists in `entries` (list id -> the indexed entry)
+        whose content or a tag contains `query`, or whose words start with every word of
+        it. None for a blank query.
+        """
+        if not query.strip():
+            return None
+
+        def fields(number: int) -> Optional[Iterable[str]]:
+            key = self._owner.get(number)
+            entry = entries.get(key[0]) if key is not None else None
+            task = entry.tasks.get(key[1]) if entry is not None else None
+            return (task.content, *task.tags) if task is not None else None
+
+        matched = self._word_numbers(query)
+        numbers = matched | self.substrings.find(query, fields, skip=matched)
+        owner = self._owner
+        return {owner[n] for n in numbers if n in owner and owner[n][0] in entries}
+
+    def search_words(self, query: str) -> Set[Posting]:
+        return {self._owner[number] for number in self._word_numbers(query) if number in self._owner}
+
+    def _word_numbers(self, query: str) -> Set[int]:
+        # Longer words first: they have the shortest posting lists
+        terms = sorted(words(query), key=len, reverse=True)
+        if not terms:
+            return set()
+        result: Optional[Set[int]] = None
+        for term in terms:
+            hits = self._prefixed(term)
+            result = hits if result is None else result & hits
+            if not result:
+                return set()
+        return result
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the postings and the number maps."""
+        postings = sum(hits.itemsize * len(hits) for hits in self.postings.values())
+        return postings + self.substrings.nbytes() + _TASK_OVERHEAD_BYTES * len(self._owner)
+
+    def __contains__(self, list_id: int) -> bool:
+        return list_id in self._lists
+
+    def __len__(self) -> int:
+        return len(self._owner)
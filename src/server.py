@@ -1,8 +1,10 @@
+import json
 import logging
 import os
 import asyncio
 import re
 from contextlib import asynccontextmanager
+from itertools import chain
 from datetime import datetime, date, timedelta
 from typing import Any, Optional, List, Dict
 from mcp.server.fastmcp import FastMCP
@@ -10,6 +12,11 @@ from src.client import CheckvistClient
 from src.service import CheckvistService
 from src.response import StandardResponse
 from src.models import Task, Checklist
+from src.checklist_index import ChecklistIndex
+from src.render import (
+    render_tree, iter_tree_lines, task_line, CHARS_PER_TOKEN,
+    join_lines, wrap_chunks, iter_flat_lines, iter_due_lines,
+)
 from src import __version__
 from dotenv import load_dotenv
 from pathlib import Path
@@ -65,20 +72,17 @@ def check_rate_limit() -> str:
         return "\n> [!WARNING]\n> High API usage detected. Consider batching requests or using search to avoid rate-limiting.\n"
     return ""
 
+def stale_notice(s: CheckvistService, *keys) -> str:
+    """ Flag responses served from cache while a background refresh is still running. """
+    if any(s.is_possibly_stale(k) for k in keys):
+        return ("\n> [!NOTE]\n> Served from cache while a refresh runs in the background; "
+                "data may be a few seconds old.\n")
+    return ""
+
 def wrap_data(content: str) -> str:
     """ Wrap user content in XML-style tags to mitigate prompt injection. """
     return f"<user_data>\n{content}\n</user_data>"
 
-def build_breadcrumb(task_id: int, task_map: dict) -> str:
-    """ Recursive helper to build breadcrumb string from task map. """
-    path = []
-    current = task_map.get(task_id)
-    while current:
-        path.insert(0, current.content)
-        pid = current.parent_id
-        current = task_map.get(pid) if pid else None
-    return " > ".join(path)
-
 
 def get_doc_content(path: Path) -> str:
     """Helper to read documentation files."""
@@ -99,16 +103,52 @@ def get_client():
         client = CheckvistClient(username, api_key)
     return client
 
+def _cache_options_from_env() -> dict:
+    """ Read optional cache tuning knobs (see .env.example). """
+    options = {}
+    if os.getenv("CHECKVIST_LIST_CACHE_TTL"):
+        options["list_cache_ttl"] = float(os.getenv("CHECKVIST_LIST_CACHE_TTL"))
+    if os.getenv("CHECKVIST_CACHE_SIZE"):
+        options["content_cache_size"] = int(os.getenv("CHECKVIST_CACHE_SIZE"))
+    if os.getenv("CHECKVIST_CACHE_TTL"):
+        options["content_cache_ttl"] = float(os.getenv("CHECKVIST_CACHE_TTL"))
+    if os.getenv("CHECKVIST_CACHE_MAX_BYTES"):
+        options["content_cache_max_bytes"] = int(os.getenv("CHECKVIST_CACHE_MAX_BYTES"))
+    if os.getenv("CHECKVIST_CACHE_POLICY"):
+        options["content_cache_policy"] = os.getenv("CHECKVIST_CACHE_POLICY").strip().lower()
+    if os.getenv("CHECKVIST_NOT_FOUND_TTL"):
+        options["not_found_ttl"] = float(os.getenv("CHECKVIST_NOT_FOUND_TTL"))
+    if os.getenv("CHECKVIST_CACHE_STALE_GRACE"):
+        options["stale_grace"] = float(os.getenv("CHECKVIST_CACHE_STALE_GRACE"))
+    if os.getenv("CHECKVIST_FULL_RESYNC_INTERVAL"):
+        options["full_resync_interval"] = float(os.getenv("CHECKVIST_FULL_RESYNC_INTERVAL"))
+    pinned = os.getenv("CHECKVIST_CACHE_PINNED_LISTS", "")
+    if pinned.strip():
+        options["pinned_lists"] = [int(l_id) for l_id in pinned.split(",") if l_id.strip()]
+    if os.getenv("CHECKVIST_SHARED_CACHE"):
+        options["shared_cache_path"] = os.getenv("CHECKVIST_SHARED_CACHE")
+    if os.getenv("CHECKVIST_SHARED_CACHE_MB"):
+        options["shared_cache_mb"] = int(os.getenv("CHECKVIST_SHARED_CACHE_MB"))
+    if os.getenv("CHECKVIST_CACHE_DB"):
+        options["mirror_path"] = os.getenv("CHECKVIST_CACHE_DB")
+    return options
+
 def get_service():
     global service
     c = get_client()
     if service is None or service.client is not c:
-        service = CheckvistService(c)
+        if service is not None:
+            service.close()
+        service = CheckvistService(c, **_cache_options_from_env())
     return service
 
 async def shutdown():
-    """ Properly close the client session. """
-    global client
+    """ Properly close the client session and the cache mirror. """
+    global client, service
+    if service:
+        await service.wait_for_refreshes()
+        service.close()
+        service = None
     if client:
         logger.info("Closing Checkvist client connection...")
         await client.close()
@@ -135,12 +175,8 @@ async def search_list(query: str) -> str:
         Returns: JSON string with keys 'success', 'message', 'data' (list of matching lists).
     """
     try:
-        c = get_client()
-        if not c.token:
-            await c.authenticate()
-            
-        lists = await c.get_checklists()
-        matches = [l for l in lists if query.lower() in l.name.lower()]
+        s = get_service()
+        matches = (await s.get_checklist_index()).find(query)
         if not matches:
             return StandardResponse.error(
                 message=f"No lists found matching '{query}'",
@@ -176,7 +212,7 @@ async def list_checklists() -> str:
     lists = await s.get_checklists()
     rate_warning = check_rate_limit()
     content = "\n".join([f"- {l.name} (ID: {l.id})" for l in lists])
-    return f"{rate_warning}\n{wrap_data(content)}"
+    return f"{rate_warning}{stale_notice(s, 'lists')}\n{wrap_data(content)}"
 
 
 @mcp.resource("checkvist://list/{list_id}")
@@ -186,19 +222,30 @@ async def get_list_content(list_id: str) -> str:
     """
 
     l_id = parse_id(list_id, "list")
-    c = get_client()
-    if not c.token:
-        await c.authenticate()
-    tasks = await c.get_tasks(l_id)
-    # Filter out logically deleted tasks
-    visible_tasks = [t for t in tasks if ARCHIVE_TAG not in t.tags]
-    
-    # Build map for breadcrumbs
-    task_map = {t.id: t for t in tasks}
-    
+    s = get_service()
+    crumbs = await s.get_breadcrumbs(l_id)
+    # Filter out logically deleted tasks (lazily: the pipeline pulls one task at a time)
+    visible_tasks = (t for t in crumbs.tasks.values() if ARCHIVE_TAG not in t.tags)
+
+    rate_warning = check_rate_limit()
+    body = wrap_chunks(join_lines(iter_flat_lines(visible_tasks, crumbs.path)))
+    return "".join(chain((rate_warning, stale_notice(s, l_id), "\n"), body))
+
+
+@mcp.resource("checkvist://list/{list_id}/page/{cursor}")
+async def get_list_content_page(list_id: str, cursor: str) -> str:
+    """ Get one page (100 tasks) of a checklist as a flat list. Start with cursor 'start';
+        the footer names the URI of the next page.
+    """
+    l_id = parse_id(list_id, "list")
+    s = get_service()
+    page = await s.get_tasks_page(l_id, cursor=None if cursor == "start" else cursor)
+
     rate_warning = check_rate_limit()
-    content = "\n".join([f"- [{'x' if t.status == 1 else ' '}] {build_breadcrumb(t.id, task_map)} (ID: {t.id})" for t in visible_tasks])
-    return f"{rate_warning}\n{wrap_data(content)}"
+    paths = {t.id: path for t, path in page["items"]}
+    body = wrap_chunks(join_lines(iter_flat_lines((t for t, _ in page["items"]), paths.__getitem__)))
+    footer = f"\nNext page: checkvist://list/{l_id}/page/{page['next_cursor']}" if page["next_cursor"] else ""
+    return "".join(chain((rate_warning, stale_notice(s, l_id), "\n"), body, (footer,)))
 
 
 @mcp.tool()
@@ -280,8 +327,7 @@ async def close_task(list_id: str, task_id: str) -> str:
         t_id = parse_id(task_id, "task")
         
         s = get_service()
-        await s.invalidate_cache(l_id)
-        task = await s.client.close_task(l_id, t_id)
+        task = await s.close_task(l_id, t_id)
             
         return StandardResponse.success(message=f"Task closed: {task.content}")
     except ValueError as e:
@@ -306,6 +352,7 @@ async def create_list(name: str, public: bool = False) -> str:
             await c.authenticate()
         
         checklist = await c.create_checklist(name, public)
+        get_service().invalidate_checklists()
         return StandardResponse.success(
             message=f"Checklist created: {checklist.name}",
             data={"id": checklist.id, "name": checklist.name}
@@ -398,18 +445,18 @@ async def move_task_tool(list_id: str, task_id: str, target_list_id: str = None,
         l_id = parse_id(list_id, "source list")
         t_id = parse_id(task_id, "task")
         
-        c = get_client()
+        s = get_service()
 
         if target_list_id:
             tl_id = parse_id(target_list_id, "target list")
             if tl_id != l_id:
                 tp_id = parse_id(target_parent_id, "target parent") if target_parent_id else None
-                await c.move_task_hierarchy(l_id, t_id, tl_id, tp_id)
+                await s.move_task_hierarchical(l_id, t_id, tl_id, tp_id)
                 return StandardResponse.success(message=f"Moved task {task_id} (and its children) from list {list_id} to list {target_list_id}.")
 
         # If we are here, it's either same list move or fallback to move_task
         tp_id = parse_id(target_parent_id, "target parent") if target_parent_id else None
-        await c.move_task(l_id, t_id, tp_id)
+        await s.move_task(l_id, t_id, tp_id)
         return StandardResponse.success(message=f"Moved task {task_id} under new parent {target_parent_id if target_parent_id else 'root'} in list {list_id}.")
     except ValueError as e:
         return StandardResponse.error(str(e), error_code="E004", action="move_task_tool", strategy="Ensure all IDs are numeric.")
@@ -436,9 +483,8 @@ async def import_tasks(list_id: str, content: str, parent_id: str = None) -> str
         p_id = parse_id(parent_id, "parent") if parent_id else None
         
         s = get_service()
-        await s.invalidate_cache(l_id)
         processed_content = re.sub(r'!!+', '!', content)
-        tasks = await s.client.import_tasks(l_id, processed_content, p_id)
+        tasks = await s.import_tasks(l_id, processed_content, p_id)
         return StandardResponse.success(message=f"Tasks imported successfully. New items count: {len(tasks)}")
     except ValueError as e:
         return StandardResponse.error(str(e), error_code="E004", action="import_tasks", strategy="Ensure IDs are positive numbers.")
@@ -464,10 +510,8 @@ async def add_note(list_id: str, task_id: str, note: str) -> str:
         l_id = parse_id(list_id, "list")
         t_id = parse_id(task_id, "task")
         
-        c = get_client()
-        if not c.token:
-            await c.authenticate()
-        await c.add_note(l_id, t_id, note)
+        s = get_service()
+        await s.add_note(l_id, t_id, note)
         return StandardResponse.success(message=f"Note added to task {t_id} in list {l_id}.")
     except ValueError as e:
         return StandardResponse.error(str(e), error_code="E004", action="add_note", strategy="Ensure IDs are numeric.")
@@ -513,13 +557,8 @@ async def get_task(list_id: str, task_id: str, include_children: bool = False, d
         }
         
         if enriched["children_tree"]:
-            def format_tree(node, level=0):
-                task_data = node['data']
-                res = "  " * level + f"- {task_data['content']} (ID: {task_data['id']})\n"
-                for child in node['children']:
-                    res += format_tree(child, level + 1)
-                return res
-            response_data["tree"] = format_tree(enriched["children_tree"])
+            lines = iter_tree_lines([enriched["children_tree"]], status=False, meta=False)
+            response_data["tree"] = "".join(f"{line}\n" for line in lines)
             
         rate_warning = check_rate_limit()
         return StandardResponse.success(
@@ -553,9 +592,7 @@ async def update_task(list_id: str, task_id: str, content: str = None, priority:
         t_id = parse_id(task_id, "task")
         
         s = get_service()
-        await s.invalidate_cache(l_id) # Invalidate cache for the list
-        
-        updated = await s.client.update_task(
+        updated = await s.update_task(
             l_id, 
             t_id, 
             content=content, 
@@ -598,6 +635,7 @@ async def rename_list(list_id: str, new_name: str) -> str:
         if not c.token:
             await c.authenticate()
         await c.rename_checklist(l_id, new_name)
+        get_service().invalidate_checklists()
         return StandardResponse.success(message=f"List {l_id} successfully renamed to '{new_name}'.")
     except ValueError as e:
         return StandardResponse.error(str(e), error_code="E004", action="rename_list", strategy="Ensure list ID is numeric.")
@@ -619,7 +657,6 @@ async def reopen_task(list_id: str, task_id: str) -> str:
         l_id = parse_id(list_id, "list")
         t_id = parse_id(task_id, "task")
         s = get_service()
-        await s.invalidate_cache(l_id) # Invalidate cache for the list
         task = await s.reopen_task(l_id, t_id)
         return StandardResponse.success(
             message=f"Task reopened: {task.content}",
@@ -650,11 +687,8 @@ async def apply_template(template_list_id: str, target_list_id: str, confirmed:
         tmp_id = parse_id(template_list_id, "template list")
         tgt_id = parse_id(target_list_id, "target list")
         
-        c = get_client()
-        if not c.token:
-            await c.authenticate()
-        
-        template_tasks = await c.get_tasks(tmp_id)
+        s = get_service()
+        template_tasks, tree = await s.get_list_tree(tmp_id)
         if not template_tasks:
              return StandardResponse.error(
                  message=f"Template list {tmp_id} is empty or not found.",
@@ -663,47 +697,32 @@ async def apply_template(template_list_id: str, target_list_id: str, confirmed:
                  strategy="Ensure the template list exists and contains tasks."
              )
             
-        # Build hierarchy
-        task_map = {t.id: {'data': t, 'children': []} for t in template_tasks}
-        roots = []
-        for t in template_tasks:
-            pid = t.parent_id or 0
-            is_root = pid == 0
-            if not is_root and pid in task_map:
-                task_map[pid]['children'].append(task_map[t.id])
-            else:
-                roots.append(task_map[t.id])
-
-        def build_lines(nodes, level=0):
-            txt_lines = []
-            for node in nodes:
-                task = node['data']
-                if ARCHIVE_TAG in task.tags:
-                    continue
-                content = task.content
-                
-                # Apply variable substitution
-                if variables:
-                     for key, val in variables.items():
-                         # Replace {{KEY}} with val
-                         content = content.replace(f"{{{{{key}}}}}", str(val))
-                         
-                priority = task.priority
-                if priority and f"!{priority}" not in content:
-                    content += f" !{priority}"
-                tags = task.tags
-                if isinstance(tags, dict): tags = list(tags.keys())
-                for tag in tags:
-                    if tag != ARCHIVE_TAG and f"#{tag}" not in content:
-                        content += f" #{tag}"
-                due = task.due_date
-                if due and f"^{due}" not in content:
-                    content += f" ^{due}"
-                txt_lines.append("  " * level + content)
-                txt_lines.extend(build_lines(node['children'], level + 1))
-            return txt_lines
-
-        import_text = "\n".join(build_lines(roots))
+        # Orphans (parent not in the template) are imported as top-level tasks.
+        # Archived tasks are skipped together with their subtree.
+        def template_line(task, level):
+            content = task.content
+            
+            # Apply variable substitution
+            if variables:
+                 for key, val in variables.items():
+                     # Replace {{KEY}} with val
+                     content = content.replace(f"{{{{{key}}}}}", str(val))
+                     
+            priority = task.priority
+            if priority and f"!{priority}" not in content:
+                content += f" !{priority}"
+            tags = task.tags
+            if isinstance(tags, dict): tags = list(tags.keys())
+            for tag in tags:
+                if tag != ARCHIVE_TAG and f"#{tag}" not in content:
+                    content += f" #{tag}"
+            due = task.due_date
+            if due and f"^{due}" not in content:
+                content += f" ^{due}"
+            return "  " * level + content
+
+        walked = tree.walk(tree.tops(), prune=lambda t_id: ARCHIVE_TAG in template_tasks[t_id].tags)
+        import_text = "\n".join(template_line(template_tasks[t_id], level) for t_id, level in walked)
         if not import_text.strip():
              return StandardResponse.error(
                  message="No valid tasks found in template to import.",
@@ -712,11 +731,11 @@ async def apply_template(template_list_id: str, target_list_id: str, confirmed:
                  strategy="Check if all tasks in the template are archived."
              )
              
-        await c.import_tasks(tgt_id, import_text)
+        await s.import_tasks(tgt_id, import_text)
         
         # Post-import verification
         imported_lines = [l for l in import_text.splitlines() if l.strip()]
-        new_tasks = await c.get_tasks(tgt_id)
+        new_tasks = await s.get_tasks(tgt_id)
         
         # Simple heuristic: verify that the last task content from import_text exists in new_tasks
         # (This is more robust than counting as the list might already have tasks)
@@ -748,11 +767,11 @@ async def get_review_data(timeframe: str = "weekly") -> str:
     For a detailed analysis with stale/blocked tasks, use 'weekly_review' tool.
     """
     try:
-        c = get_client()
-        checklists = await c.get_checklists()
+        s = get_service()
+        checklists = await s.get_checklists()
         stats = []
         for l in checklists[:5]: # Limit to first 5 for speed
-            tasks = await c.get_tasks(l.id)
+            tasks = await s.get_tasks(l.id)
             done = len([t for t in tasks if t.status == 1])
             open_ts = len([t for t in tasks if t.status == 0])
             stats.append({"list": l.name, "completed": done, "open": open_ts})
@@ -809,15 +828,12 @@ async def migrate_incomplete_tasks(source_list_id: str, target_list_id: str, con
         src_id = parse_id(source_list_id, "source list")
         tgt_id = parse_id(target_list_id, "target list")
         
-        c = get_client()
-        if not c.token:
-            await c.authenticate()
-        
-        tasks = await c.get_tasks(src_id)
+        s = get_service()
+        tasks = await s.get_tasks(src_id)
         incomplete = [t for t in tasks if t.status == 0]
         
         for t in incomplete:
-            await c.move_task_hierarchy(src_id, t.id, tgt_id)
+            await s.move_task_hierarchical(src_id, t.id, tgt_id)
             
         return StandardResponse.success(message=f"Successfully migrated {len(incomplete)} incomplete tasks to list {target_list_id}.")
     except ValueError as e:
@@ -831,11 +847,12 @@ async def migrate_incomplete_tasks(source_list_id: str, target_list_id: str, con
             error_details=str(e)
         )
 
-def analyze_task_heuristics(task: dict, checklists: list) -> dict | None:
+def analyze_task_heuristics(task: dict, checklists: list | ChecklistIndex) -> dict | None:
     """
     Analyze a task and suggest actions based on heuristics.
     """
     content = task.get("content", "").lower()
+    index = checklists if isinstance(checklists, ChecklistIndex) else ChecklistIndex(checklists)
     
     # Heuristic 1: Keyword Matching
     keyword_map = {
@@ -848,7 +865,7 @@ def analyze_task_heuristics(task: dict, checklists: list) -> dict | None:
     
     for kw, target_name in keyword_map.items():
         if kw in content:
-            target = next((l for l in checklists if target_name.lower() in l.name.lower()), None)
+            target = index.best_match(target_name)
             if target:
                 return {
                     "action": "move", 
@@ -865,28 +882,24 @@ async def triage_inbox(inbox_name: str = "Inbox", analyze: bool = False) -> str:
         Returns: JSON string with keys 'success', 'message', 'data' (triage tasks list).
     """
     try:
-        c = get_client()
-        if not c.token:
-            await c.authenticate()
-            
-        checklists = await c.get_checklists()
-        inbox = next((l for l in checklists if inbox_name.lower() in l.name.lower()), None)
-        
+        s = get_service()
+        index = await s.get_checklist_index()
+        inbox = index.best_match(inbox_name)
+
         if not inbox:
             return StandardResponse.error(
                 message=f"List named '{inbox_name}' not found.",
                 error_code="E002",
                 action="triage_inbox",
-                strategy=f"Available lists: {', '.join([l.name for l in checklists])}"
+                strategy=f"Available lists: {', '.join([l.name for l in index.lists])}"
             )
             
-        tasks = await c.get_tasks(inbox.id)
-        open_tasks = [t for t in tasks if t.status == 0 and ARCHIVE_TAG not in t.tags]
+        crumbs = await s.get_breadcrumbs(inbox.id)
+        open_tasks = [t for t in crumbs.tasks.values() if t.status == 0 and ARCHIVE_TAG not in t.tags]
         
         if not open_tasks:
             return StandardResponse.success(message=f"Inbox ({inbox.name}) is empty! Good job.")
             
-        task_map = {t.id: t for t in tasks}
         rate_warning = check_rate_limit()
         formatted_tasks = []
         
@@ -894,11 +907,11 @@ async def triage_inbox(inbox_name: str = "Inbox", analyze: bool = False) -> str:
              item = {
                  "id": t.id,
                  "content": wrap_data(t.content),
-                 "breadcrumb": wrap_data(build_breadcrumb(t.id, task_map))
+                 "breadcrumb": wrap_data(crumbs.path(t.id))
              }
              
              if analyze:
-                 suggestion = analyze_task_heuristics(item, checklists)
+                 suggestion = analyze_task_heuristics(item, index)
                  if suggestion:
                      item["suggestion"] = suggestion
                      
@@ -920,62 +933,65 @@ async def triage_inbox(inbox_name: str = "Inbox", analyze: bool = False) -> str:
 
 
 @mcp.tool()
-async def get_tree(list_id: str, depth: int = 1) -> str:
+async def get_tree(list_id: str, depth: int = 1, cursor: str = None, page_size: int = None,
+                   root_task_id: str = None, budget: int = None, expand_by: str = "priority") -> str:
     """ [STABLE] Get the task tree for a list, respecting a depth limit to save tokens.
-        Returns: JSON string with keys 'success', 'message', 'data' (tree structure string).
+        Pass `root_task_id` to drill into one branch (depth counts from that task).
+        Pass `page_size` (and then the returned `next_cursor` as `cursor`) to read a large
+        tree page by page instead of truncated.
+        Pass `budget` (estimated tokens) instead of a depth to expand the tree breadth-first,
+        by `expand_by` ('priority', 'recency' or 'order'), as far as the budget allows;
+        collapsed tasks show `[F: n]` (n hidden children). `depth` is ignored in that mode.
+        Returns: JSON string with keys 'success', 'message', 'data' (tree structure string,
+        or {'tree', 'next_cursor'} when paginating).
     """
     try:
         l_id = parse_id(list_id, "list")
         
-        s = get_service()
-        roots = await s.get_tree(l_id, int(depth))
-                
-        def print_node(node, current_depth):
-            # Depth check is now handled by service, but we keep this for safety
-            # against recursive printing if service changes behavior
-            if current_depth > depth + 1: 
-                return ""
-            
-            task_dict = node['data']
-            status = 'x' if task_dict.get('status', 0) == 1 else ' '
-            indent = "  " * (current_depth - 1)
-            
-            meta = []
-            priority = task_dict.get('priority', 0)
-            if priority > 0:
-                meta.append(f"!{priority}")
-            if task_dict.get('due_date'): 
-                meta.append(f"^{task_dict['due_date']}")
-            
-            tags = task_dict.get('tags', [])
-            for tag in tags:
-                if tag != ARCHIVE_TAG: 
-                    meta.append(f"#{tag}")
-                
-            meta_str = " " + " ".join(meta) if meta else ""
-            line = f"{indent}- [{status}] {task_dict.get('content', 'No content')}{meta_str} (ID: {task_dict.get('id')})"
-            
-            children_output = ""
-            for child in node['children']:
-                res = print_node(child, current_depth + 1)
-                if res: children_output += "\n" + res
-                
-            return line + children_output
+        r_id = parse_id(root_task_id, "task") if root_task_id else None
+        scope = f"task {root_task_id} of list {list_id}" if r_id else f"list {list_id}"
 
-        output = []
-        for root in roots:
-            res = print_node(root, 1)
-            if res.strip():
-                output.append(res)
+        s = get_service()
+        if budget:
+            plan = await s.get_tree_within_budget(l_id, int(budget) * CHARS_PER_TOKEN, expand_by=expand_by,
+                                                  root_task_id=r_id)
+            content = "\n".join(task_line(task, level, folded=folded) for task, level, folded in plan["items"])
+            omitted = f" {plan['omitted']} top-level tasks did not fit." if plan["omitted"] else ""
+            rate_warning = check_rate_limit()
+            return StandardResponse.success(
+                message=(f"Fetched {len(plan['items'])} tasks of {scope} "
+                         f"(~{plan['chars'] // CHARS_PER_TOKEN} of {budget} tokens)."
+                         f"{omitted}{rate_warning}{stale_notice(s, l_id)}"),
+                data=wrap_data(content)
+            )
+        if cursor or page_size:
+            page = await s.get_tree_page(l_id, int(depth), cursor=cursor, page_size=int(page_size or 100),
+                                         root_task_id=r_id)
+            content = "\n".join(task_line(task, level) for task, level in page["items"])
+            more = " More available: pass next_cursor as cursor." if page["next_cursor"] else ""
+            rate_warning = check_rate_limit()
+            return StandardResponse.success(
+                message=(f"Fetched {len(page['items'])} tasks of {scope} (depth={depth})."
+                         f"{more}{rate_warning}{stale_notice(s, l_id)}"),
+                data={"tree": wrap_data(content), "next_cursor": page["next_cursor"]}
+            )
+        if r_id:
+            roots = await s.get_subtree(l_id, r_id, int(depth))
+        else:
+            roots = await s.get_tree(l_id, int(depth))
+        # Depth is enforced by the service; the renderer bound is a safety net
+        content = render_tree(roots, max_level=int(depth))
                 
         rate_warning = check_rate_limit()
-        content = "\n".join(output)
         return StandardResponse.success(
-            message=f"Fetched tree for list {list_id} (depth={depth}).{rate_warning}",
+            message=f"Fetched tree for {scope} (depth={depth}).{rate_warning}{stale_notice(s, l_id)}",
             data=wrap_data(content)
         )
     except ValueError as e:
-        return StandardResponse.error(str(e), error_code="E004", action="get_tree", strategy="Ensure list ID is numeric.")
+        return StandardResponse.error(
+            str(e), error_code="E004", action="get_tree",
+            strategy="Ensure list and task IDs are numeric and the cursor comes from a previous page."
+        )
     except Exception as e:
         return StandardResponse.error(
             message="Failed to fetch tree",
@@ -986,6 +1002,53 @@ async def get_tree(list_id: str, depth: int = 1) -> str:
         )
 
 
+@mcp.tool()
+async def get_changes(list_id: str, since: str = None) -> str:
+    """ Get what changed in a list since an earlier call, instead of re-reading the whole list.
+        The first call (no `since`) returns only a snapshot token; pass the returned `since`
+        on the next call to receive added, removed, moved (parent changed), edited, closed
+        and reopened tasks.
+        Returns: JSON string with keys 'success', 'message', 'data' ({'since', 'changes'}).
+    """
+    try:
+        l_id = parse_id(list_id, "list")
+        s = get_service()
+        result = await s.get_changes(l_id, since=since)
+        changes = result["changes"]
+        rate_warning = check_rate_limit()
+        if changes is None:
+            return StandardResponse.success(
+                message=(f"Snapshot taken for list {list_id}. "
+                         f"Pass since='{result['since']}' to get changes later.{rate_warning}"),
+                data={"since": result["since"], "changes": None}
+            )
+        for bucket in changes.values():
+            for item in bucket:
+                item["content"] = wrap_data(item["content"])
+                if "fields" in item and "content" in item["fields"]:
+                    item["fields"]["content"] = [wrap_data(v) for v in item["fields"]["content"]]
+                if "fields" in item and "notes" in item["fields"]:
+                    item["fields"]["notes"] = [wrap_data(v) if v else v for v in item["fields"]["notes"]]
+        summary = ", ".join(f"{len(bucket)} {name}" for name, bucket in changes.items() if bucket) or "no changes"
+        return StandardResponse.success(
+            message=f"List {list_id} since {since}: {summary}.{rate_warning}{stale_notice(s, l_id)}",
+            data={"since": result["since"], "changes": changes}
+        )
+    except ValueError as e:
+        return StandardResponse.error(
+            str(e), error_code="E004", action="get_changes",
+            strategy="Ensure list ID is numeric and 'since' comes from a previous get_changes call."
+        )
+    except Exception as e:
+        return StandardResponse.error(
+            message="Failed to compute changes",
+            error_code="E004",
+            action=f"get_changes(list_id={list_id})",
+            strategy="Check if the list ID is valid and accessible.",
+            error_details=str(e)
+        )
+
+
 @mcp.tool()
 async def resurface_ideas() -> str:
     """ Randomly pick open tasks from old lists to resurface ideas. 
@@ -993,11 +1056,9 @@ async def resurface_ideas() -> str:
     """
     try:
         import random
-        c = get_client()
-        if not c.token:
-            await c.authenticate()
-            
-        checklists = await c.get_checklists()
+        s = get_service()
+        # Copy: shuffling must not reorder the cached checklist metadata
+        checklists = list(await s.get_checklists())
         if not checklists:
             return StandardResponse.error(message="No lists found.", error_code="E002", action="resurface_ideas", strategy="Create some lists first!")
             
@@ -1005,12 +1066,11 @@ async def resurface_ideas() -> str:
         candidates = []
         
         for l in checklists[:3]:
-            tasks = await c.get_tasks(l.id)
+            tasks = await s.get_tasks(l.id)
             open_tasks = [t for t in tasks if t.status == 0]
             if open_tasks:
-                task_map = {t.id: t for t in tasks}
                 t = random.choice(open_tasks)
-                breadcrumb = wrap_data(build_breadcrumb(t.id, task_map))
+                breadcrumb = wrap_data((await s.get_breadcrumbs(l.id)).path(t.id))
                 candidates.append({"breadcrumb": breadcrumb, "list": wrap_data(l.name), "id": t.id})
                 
         if not candidates:
@@ -1024,6 +1084,47 @@ async def resurface_ideas() -> str:
     except Exception as e:
         return StandardResponse.error(message="Failed to resurface ideas", error_code="E004", action="resurface_ideas", strategy="Try again later.", error_details=str(e))
 
+async def fetch_due_tasks(filter: str = "all") -> tuple:
+    """ Due tasks across all checklists matching `filter`, sorted by date, and a list id -> name map. """
+    c = get_client()
+    if not c.token:
+        await c.authenticate()
+
+    # 1. Fetch due tasks
+    tasks = await c.get_due_tasks()
+
+    # 2. Fetch checklists for naming
+    checklists = await get_service().get_checklists()
+    list_map = {l.id: l.name for l in checklists}
+
+    # 3. Filter by date logic
+    today_dt = date.today()
+    tomorrow_dt = today_dt + timedelta(days=1)
+
+    filtered = []
+    for t in tasks:
+        due_str = t.due_date
+        if not due_str: continue
+        try:
+            # Format is YYYY/MM/DD according to probe
+            due_date_obj = datetime.strptime(due_str, "%Y/%m/%d").date()
+        except:
+            continue
+
+        if filter == "today" and due_date_obj == today_dt:
+            filtered.append(t)
+        elif filter == "overdue" and due_date_obj < today_dt:
+            filtered.append(t)
+        elif filter == "tomorrow" and due_date_obj == tomorrow_dt:
+            filtered.append(t)
+        elif filter == "all":
+            filtered.append(t)
+
+    # 4. Sort by due date
+    filtered.sort(key=lambda x: x.due_date or '')
+    return filtered, list_map
+
+
 @mcp.tool()
 async def get_upcoming_tasks(filter: str = "all") -> str:
     """
@@ -1034,42 +1135,7 @@ async def get_upcoming_tasks(filter: str = "all") -> str:
     Returns: JSON string with keys 'success', 'message', 'data' (list of tasks).
     """
     try:
-        c = get_client()
-        if not c.token:
-            await c.authenticate()
-        
-        # 1. Fetch due tasks
-        tasks = await c.get_due_tasks()
-        
-        # 2. Fetch checklists for naming
-        checklists = await c.get_checklists()
-        list_map = {l.id: l.name for l in checklists}
-        
-        # 3. Filter by date logic
-        today_dt = date.today()
-        tomorrow_dt = today_dt + timedelta(days=1)
-        
-        filtered = []
-        for t in tasks:
-            due_str = t.due_date
-            if not due_str: continue
-            try:
-                # Format is YYYY/MM/DD according to probe
-                due_date_obj = datetime.strptime(due_str, "%Y/%m/%d").date()
-            except:
-                continue
-            
-            if filter == "today" and due_date_obj == today_dt:
-                filtered.append(t)
-            elif filter == "overdue" and due_date_obj < today_dt:
-                filtered.append(t)
-            elif filter == "tomorrow" and due_date_obj == tomorrow_dt:
-                filtered.append(t)
-            elif filter == "all":
-                filtered.append(t)
-                
-        # 4. Sort by due date
-        filtered.sort(key=lambda x: x.due_date or '')
+        filtered, list_map = await fetch_due_tasks(filter)
 
         rate_warning = check_rate_limit()
         formatted = []
@@ -1099,26 +1165,16 @@ async def get_upcoming_tasks(filter: str = "all") -> str:
 @mcp.resource("checkvist://due")
 async def due_resource() -> str:
     """ Get all upcoming due tasks as a formatted resource. """
-    res = await get_upcoming_tasks(filter="all")
-    import json
-    data = json.loads(res)
-    if not data.get('success'):
-        return f"Error: {data.get('message')}"
-    
-    tasks = data.get('data', [])
+    try:
+        tasks, list_map = await fetch_due_tasks("all")
+    except Exception:
+        return "Error: Failed to fetch upcoming tasks"
     if not tasks:
         return "No upcoming tasks found with due dates."
-    
-    lines = ["# Upcoming Due Tasks"]
-    # Group by date for better readability
-    current_date = None
-    for t in tasks:
-        if t['due'] != current_date:
-            current_date = t['due']
-            lines.append(f"\n## {current_date}")
-        lines.append(f"- {t['content']} [{t['list_name']}] (ID: {t['id']})")
-        
-    return wrap_data("\n".join(lines))
+
+    # Grouped by date; the whole agenda is inside one <user_data> envelope
+    lines = iter_due_lines(tasks, lambda l_id: list_map.get(l_id, "Unknown List"))
+    return "".join(wrap_chunks(join_lines(lines)))
 
 @mcp.tool()
 async def archive_task(list_id: str, task_id: str) -> str:
@@ -1148,6 +1204,12 @@ async def archive_task(list_id: str, task_id: str) -> str:
 
 # --- Documentation Resources ---
 
+@mcp.resource("checkvist://stats/cache")
+async def cache_stats_resource() -> str:
+    """ [STABLE] Cache and sync statistics (hits, misses, evictions, bytes, entry ages, pending refreshes). """
+    return json.dumps(get_service().get_cache_stats(), indent=2)
+
+
 @mcp.resource("checkvist://docs/research-index")
 async def get_research_index() -> str:
     """ Get the central index of all PKM and workflow research. """
@@ -1,110 +1,551 @@
 import asyncio
 import logging
-from typing import List, Dict, Any, Optional
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Iterable, Optional, Tuple
 from cachetools import TTLCache
+from .cache import ListContentCache, CachedList
+from .sync import compute_watermark, merge_delta, timestamp_key
+from .storage import SQLiteMirror
+from .shared_cache import SharedListCache
+from .checklist_index import ChecklistIndex
+from .diff import Snapshot, snapshot, diff_snapshots
+from .merkle import MerkleIndex
+from .search_index import TaskSearchIndex
+from .hierarchy import TreeIndex, BreadcrumbIndex
+from .render import task_line
 from .client import CheckvistClient
+from .exceptions import CheckvistResourceNotFoundError
 from .syntax import SyntaxParser
-from .models import Task, Checklist
+from .models import Task, Checklist, Comment
 
 logger = logging.getLogger(__name__)
 
+
+def _build_tree_index(entry: CachedList) -> TreeIndex:
+    return TreeIndex(entry.tasks.values())
+
+
+def _merkle(entry: CachedList) -> MerkleIndex:
+    """Merkle hashes of the list, updated in place from the entry's patch log."""
+    tree = entry.derived("tree", _build_tree_index)
+    return entry.incremental(
+        "merkle", lambda e: MerkleIndex(tree, e.tasks),
+        lambda index, changed: index.update(tree, entry.tasks, changed)
+    )
+
+
+def _search_hit(task: Task, list_id: int, list_name: str, crumbs: BreadcrumbIndex, tree: TreeIndex) -> Dict[str, Any]:
+    """Search result dict: the task plus list info and an indicator/metadata breadcrumb."""
+    # Indicators via Pydantic model
+    child_count = len(tree.children.get(task.id, ()))
+
+    indicators = []
+    if task.has_notes: indicators.append("[N]")
+    if task.has_comments: indicators.append("[C]")
+    if child_count > 0: indicators.append(f"[F: {child_count}]")
+    ind_str = " ".join(indicators) + " " if indicators else ""
+
+    # Metadata string from models
+    meta = []
+    if task.priority > 0:
+        meta.append(f"!{task.priority}")
+    if task.due_date: meta.append(f"^{task.due_date}")
+    for tag in task.tags:
+         if tag != "deleted": meta.append(f"#{tag}")
+    meta_str = " " + " ".join(meta) if meta else ""
+
+    task_dict = task.model_dump()
+    task_dict["list_name"] = list_name
+    task_dict["list_id"] = list_id
+    task_dict["breadcrumb"] = f"{ind_str}{crumbs.path(task.id)}{meta_str}"
+    return task_dict
+
+
+def _api_positions(entry: CachedList) -> Tuple[List[int], Dict[int, int]]:
+    order = list(entry.tasks)
+    return order, {t_id: i for i, t_id in enumerate(order)}
+
+
+def _encode_cursor(order: List[int], position: Optional[int]) -> Optional[str]:
+    """Cursor naming the next item by id (stable across edits) and position (fallback if it is gone)."""
+    return f"{order[position]}:{position}" if position is not None else None
+
+
+def _cursor_start(cursor: Optional[str], positions: Dict[int, int]) -> int:
+    if not cursor:
+        return 0
+    try:
+        task_id, position = (int(part) for part in cursor.split(":"))
+    except ValueError:
+        raise ValueError(f"Invalid cursor: '{cursor}'. Use the next_cursor of a previous page.")
+    return positions.get(task_id, position)
+
+
+def _breadcrumbs(entry: CachedList) -> BreadcrumbIndex:
+    # Paths include task content, so they follow every patch (not only structural ones)
+    return entry.derived("breadcrumbs", lambda e: BreadcrumbIndex(e.tasks), structural=False)
+
+
+def _nest(tasks: Dict[int, Task], walked: Iterable[Tuple[int, int]],
+          truncate_at: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Turn TreeIndex.walk() output into nested {'data', 'children'} dicts without recursion."""
+    tops: List[Dict[str, Any]] = []
+    stack: List[Dict[str, Any]] = []
+    for t_id, level in walked:
+        node = {"data": tasks[t_id].model_dump(), "children": []}
+        if truncate_at is not None and level >= truncate_at:
+            node["truncated"] = True
+        del stack[level:]
+        (stack[-1]["children"] if stack else tops).append(node)
+        stack.append(node)
+    return tops
+
+
 class CheckvistService:
-    def __init__(self, client: CheckvistClient):
+    def __init__(self, client: CheckvistClient, list_cache_ttl: float = 15,
+                 content_cache_size: int = 10, content_cache_ttl: float = 30,
+                 pinned_lists: Optional[List[int]] = None, full_resync_interval: float = 600,
+                 mirror_path: Optional[str] = None, stale_grace: float = 60,
+                 content_cache_max_bytes: Optional[int] = None, content_cache_policy: str = "lru",
+                 not_found_ttl: float = 30, shared_cache_path: Optional[str] = None,
+                 shared_cache_mb: int = 64):
         self.client = client
         self.parser = SyntaxParser()
         # Cache for list metadata (name, id) to avoid N+1 lookups
-        self.list_cache = TTLCache(maxsize=100, ttl=15)
-        # Cache for list contents to avoid redundant fetches for breadcrumbs
-        self.list_content_cache = TTLCache(maxsize=10, ttl=30)
+        self.list_cache = TTLCache(maxsize=100, ttl=list_cache_ttl)
+        # Word and trigram index over the cached lists: search_tasks answers those locally and asks
+        # Checkvist only about the rest. Larger lists are indexed in the background.
+        self.search_index = TaskSearchIndex()
+        self.search_stats = {"local": 0, "upstream": 0}
+        self.search_inline_tasks = 2000
+        # Read-through cache for list contents: every list read goes through get_tasks()
+        self.list_content_cache = ListContentCache(
+            maxsize=content_cache_size, ttl=content_cache_ttl, pinned=pinned_lists,
+            max_bytes=content_cache_max_bytes, policy=content_cache_policy,
+            on_remove=self.search_index.remove_list
+        )
+        # Outdated cached lists are delta-synced; a full download still happens at this interval
+        self.full_resync_interval = full_resync_interval
+        self.sync_stats = {"delta_syncs": 0, "full_syncs": 0, "tasks_merged": 0, "tasks_removed": 0,
+                           "unchanged_skips": 0, "stale_served": 0, "discarded_fetches": 0, "shared_hits": 0}
+        # Bumped by every mutation; fetches started under an older generation are not cached
+        self._generations: Dict[int, int] = {}
+        self._epoch = 0  # bumped by a full invalidation
+        # Stale-while-revalidate: up to `stale_grace` seconds past a TTL the cached value is
+        # returned at once and refreshed in the background; beyond that reads block.
+        self.stale_grace = stale_grace
+        self._checklists: Optional[Tuple[List[Checklist], float]] = None
+        self.checklist_stats = {"hits": 0, "misses": 0}
+        self._checklist_index: Optional[ChecklistIndex] = None
+        # Negative cache: (list_id, None) for missing lists, (list_id, task_id) for missing tasks.
+        # Cleared by any mutation on the list, so retries with wrong ids stay local.
+        self.not_found = TTLCache(maxsize=1000, ttl=not_found_ttl)
+        self.not_found_hits = 0
+        # Optional on-disk mirror for warm starts (served once, then revalidated in the background)
+        self.mirror = SQLiteMirror(mirror_path) if mirror_path else None
+        self._mirror_checklists_served = False
+        # Optional host-wide snapshot store shared with other server processes
+        self.shared = SharedListCache(shared_cache_path, size_mb=shared_cache_mb) if shared_cache_path else None
+        self._refreshes: Dict[Any, asyncio.Task] = {}
+        # Snapshots handed out by get_changes: list id -> token -> (taken_at, snapshot, merkle),
+        # newest last. Also persisted in the mirror (when configured, without the Merkle hashes)
+        # so tokens survive restarts.
+        self.snapshots: Dict[int, "OrderedDict[str, Tuple[float, Snapshot, Optional[MerkleIndex]]]"] = {}
+        self.snapshots_per_list = 8
 
     async def _get_authed_client(self) -> CheckvistClient:
         if not self.client.token:
             await self.client.authenticate()
         return self.client
 
+    def close(self):
+        if self.mirror is not None:
+            self.mirror.close()
+            self.mirror = None
+        if self.shared is not None:
+            self.shared.close()
+            self.shared = None
 
     async def get_checklists(self) -> List[Dict[str, Any]]:
-        client = await self._get_authed_client()
         if "lists" in self.list_cache:
+            self.checklist_stats["hits"] += 1
             return self.list_cache["lists"]
-        
+        self.checklist_stats["misses"] += 1
+        if self._checklists is not None:
+            lists, fetched_at = self._checklists
+            if self.list_cache.timer() - fetched_at < self.list_cache.ttl + self.stale_grace:
+                self.sync_stats["stale_served"] += 1
+                self._schedule_refresh("lists", self._refresh_checklists)
+                return lists
+        if self.mirror is not None and not self._mirror_checklists_served:
+            self._mirror_checklists_served = True
+            stored = self.mirror.load_checklists()
+            if stored is not None:
+                # No markers from disk: they must not vouch for mirrored task tables
+                self.list_cache["lists"] = stored[0]
+                self._schedule_refresh("lists", self._refresh_checklists)
+                return stored[0]
+        return await self._refresh_checklists()
+
+    async def _refresh_checklists(self) -> List[Checklist]:
+        client = await self._get_authed_client()
         lists = await client.get_checklists()
         self.list_cache["lists"] = lists
+        self._checklists = (lists, self.list_cache.timer())
+        # Markers expire with the metadata they came from
+        self.list_cache["markers"] = {l.id: l.change_marker() for l in lists}
+        if self.mirror is not None:
+            self.mirror.save_checklists(lists, time.time())
         return lists
 
-    async def get_list_name(self, list_id: int) -> str:
+    def _current_marker(self, list_id: int) -> Optional[tuple]:
+        markers = self.list_cache.get("markers")
+        return markers.get(list_id) if markers else None
+
+    async def get_checklist_index(self) -> ChecklistIndex:
+        """Id, name and trigram index over the current checklists (rebuilt when the snapshot changes)."""
         lists = await self.get_checklists()
-        for l in lists:
-            if l.id == list_id:
-                return l.name
-        return "Unknown"
+        if self._checklist_index is None or self._checklist_index.source is not lists:
+            self._checklist_index = ChecklistIndex(lists)
+        return self._checklist_index
+
+    async def get_list_name(self, list_id: int) -> str:
+        checklist = (await self.get_checklist_index()).get(list_id)
+        return checklist.name if checklist else "Unknown"
+
+    async def get_tasks(self, list_id: int) -> List[Task]:
+        """Read-through access to a list's tasks. Returned Task objects are shared with the cache."""
+        entry = await self._get_list_entry(list_id)
+        return entry.task_list()
+
+    async def _get_list_entry(self, list_id: int, require_task: Optional[int] = None) -> CachedList:
+        """
+        Cached list lookup. With `require_task`, a cached list that does not contain
+        that task is considered outdated (e.g. created by another client) and refetched once.
+        """
+        self._check_not_found(list_id)
+        entry = self.list_content_cache.get(list_id)
+        if entry is not None and (require_task is None or require_task in entry.tasks):
+            return entry
+        outdated = self.list_content_cache.peek(list_id)
+        if self.shared is not None:
+            adopted = self._adopt_shared(list_id, outdated)
+            if adopted is not None:
+                outdated = adopted
+                fresh = self.list_content_cache.timer() - adopted.fetched_at < self.list_content_cache.ttl
+                if fresh and (require_task is None or require_task in adopted.tasks):
+                    self.sync_stats["shared_hits"] += 1
+                    return adopted
+        if outdated is None and self.mirror is not None:
+            outdated = self._load_from_mirror(list_id)
+            # A mirrored list within its TTL is served as is; an older one goes through the
+            # same stale-while-revalidate window (or blocking delta sync) as an outdated entry
+            if outdated is not None and (require_task is None or require_task in outdated.tasks) and \
+                    self.list_content_cache.is_fresh(outdated):
+                return outdated
+        marker = self._current_marker(list_id)
+        if outdated is not None and require_task is None:
+            age = self.list_content_cache.timer() - outdated.fetched_at
+            servable = age < self.list_content_cache.ttl + self.stale_grace
+            if marker is None and outdated.marker is not None and not servable and self._checklists is None:
+                # Warm start: no markers fetched by this process yet. One /checklists.json call
+                # can vouch for every mirrored list, instead of a download per list
+                marker = await self._startup_marker(list_id)
+            if marker is not None and marker == outdated.marker:
+                # Recent /checklists.json says the list did not change since the last sync
+                self.list_content_cache.touch(list_id)
+                self.sync_stats["unchanged_skips"] += 1
+                return outdated
+            if servable:
+                self.sync_stats["stale_served"] += 1
+                self._schedule_refresh(list_id, lambda: self._sync_list(list_id))
+                return outdated
+        return await self._sync_list(list_id)
+
+    async def _startup_marker(self, list_id: int) -> Optional[tuple]:
+        """Wait for the (shared, possibly already running) checklist refresh and return the list's marker."""
+        self._schedule_refresh("lists", self._refresh_checklists)
+        refresh = self._refreshes.get("lists")
+        if refresh is not None:
+            await refresh
+        return self._current_marker(list_id)
+
+    async def _sync_list(self, list_id: int) -> CachedList:
+        """
+        Bring a list up to date: delta merge into the cached entry, or a full download.
+        A download that raced with a mutation on the list (its generation moved while the
+        request was in flight) is returned to the caller but never written to the caches.
+        """
+        client = await self._get_authed_client()
+        outdated = self.list_content_cache.peek(list_id)
+        marker = self._current_marker(list_id)
+        now = self.list_content_cache.timer()
+        generation = self._generation(list_id)
+        started = time.time()
+        if outdated is not None and now - outdated.full_synced_at < self.full_resync_interval:
+            rows = await self._remember_not_found((list_id, None), client.get_tasks_raw(list_id))
+            if self._generation(list_id) != generation:
+                return self._discard_fetch(list_id, [Task(**row) for row in rows])
+            result = merge_delta(outdated, rows)
+            outdated.marker = marker
+            self.list_content_cache.touch(list_id)
+            self.sync_stats["delta_syncs"] += 1
+            self.sync_stats["tasks_merged"] += len(result["merged"])
+            self.sync_stats["tasks_removed"] += len(result["removed"])
+            if self.mirror is not None and result["reordered"]:
+                # The mirror keeps list order as insertion order: rewrite the list
+                self.mirror.save_list(list_id, outdated.task_list(), outdated.watermark, marker, time.time())
+            elif self.mirror is not None:
+                self.mirror.apply_delta(
+                    list_id, [outdated.tasks[t_id] for t_id in result["merged"]], result["removed"],
+                    outdated.watermark, marker, time.time()
+                )
+            if self.shared is not None:
+                unchanged = not result["merged"] and not result["removed"] and not result["reordered"]
+                if not (unchanged and self.shared.touch(list_id, started)):
+                    self._share(outdated, started)
+            return outdated
+        tasks = await self._remember_not_found((list_id, None), client.get_tasks(list_id))
+        if self._generation(list_id) != generation:
+            return self._discard_fetch(list_id, tasks)
+        entry = self.list_content_cache.put(list_id, tasks)
+        entry.watermark = compute_watermark(tasks)
+        entry.marker = marker
+        self.sync_stats["full_syncs"] += 1
+        if self.mirror is not None:
+            self.mirror.save_list(list_id, tasks, entry.watermark, marker, time.time())
+        if self.shared is not None:
+            self._share(entry, started)
+        return entry
+
+    def _discard_fetch(self, list_id: int, tasks: List[Task]) -> CachedList:
+        """
+        Answer from a download that predates a mutation without caching it.
+        A cached entry that survived the mutation was patched by it, so it is preferred.
+        """
+        self.sync_stats["discarded_fetches"] += 1
+        logger.debug(f"List {list_id} changed during fetch, result not cached")
+        entry = self.list_content_cache.peek(list_id)
+        if entry is not None:
+            return entry
+        return CachedList(list_id, tasks, self.list_content_cache.timer())
+
+    def _generation(self, list_id: int) -> Tuple[int, int]:
+        return self._epoch, self._generations.get(list_id, 0)
+
+    def _note_mutation(self, list_id: int):
+        """
+        Bump the list's generation (outdating in-flight fetches), tombstone its shared snapshot
+        and forget its 404s. A mirrored copy of a list that is not in memory (evicted, or not
+        read since a restart) cannot be patched and is dropped.
+        """
+        self._generations[list_id] = self._generations.get(list_id, 0) + 1
+        if self.mirror is not None and list_id not in self.list_content_cache:
+            self.mirror.delete_list(list_id)
+        if self.shared is not None:
+            # Other processes must not keep serving the pre-mutation snapshot
+            self.shared.delete(list_id, time.time())
+        for key in [k for k in self.not_found if k[0] == list_id]:
+            self.not_found.pop(key, None)
+
+    def _check_not_found(self, list_id: int, task_id: Optional[int] = None):
+        """Fail fast for ids that returned 404 recently."""
+        for key in ((list_id, None), (list_id, task_id)):
+            message = self.not_found.get(key)
+            if message is not None:
+                self.not_found_hits += 1
+                raise CheckvistResourceNotFoundError(message, status_code=404)
+            if task_id is None:
+                break
+
+    async def _remember_not_found(self, key: Tuple[int, Optional[int]], call):
+        """Await an upstream lookup, recording a 404 under `key` in the negative cache."""
+        try:
+            return await call
+        except CheckvistResourceNotFoundError as e:
+            self.not_found[key] = str(e)
+            raise
+
+    def _load_from_mirror(self, list_id: int) -> Optional[CachedList]:
+        stored = self.mirror.load_list(list_id)
+        if stored is None:
+            return None
+        return self._adopt_snapshot(list_id, stored)
+
+    def _adopt_shared(self, list_id: int, current: Optional[CachedList]) -> Optional[CachedList]:
+        """Take the shared snapshot of a list if another process synced it more recently than we did."""
+        synced_at = self.shared.synced_at(list_id)
+        if synced_at is None:
+            return None
+        age = time.time() - synced_at
+        if current is not None and self.list_content_cache.timer() - current.fetched_at <= age:
+            return None
+        # Decode the payload only once the slot says it is newer than our copy
+        stored = self.shared.get(list_id)
+        if stored is None:
+            return None
+        return self._adopt_snapshot(list_id, stored)
+
+    def _share(self, entry: CachedList, synced_at: float):
+        """Publish a list snapshot to the shared store (rejected there if a newer one exists)."""
+        self.shared.put(entry.list_id, entry.task_list(), entry.watermark, entry.marker, synced_at)
+
+    def _adopt_snapshot(self, list_id: int, stored: Dict[str, Any]) -> CachedList:
+        entry = self.list_content_cache.put(list_id, stored["tasks"])
+        # Map the wall-clock sync time onto the cache's monotonic clock
+        age = max(0.0, time.time() - stored["synced_at"])
+        entry.fetched_at = entry.full_synced_at = self.list_content_cache.timer() - age
+        entry.watermark = stored["watermark"]
+        entry.marker = stored["marker"]
+        return entry
+
+    def _schedule_refresh(self, key: Any, refresh):
+        """Run `refresh()` in the background, at most once concurrently per key."""
+        if key in self._refreshes:
+            return
+
+        async def run():
+            try:
+                await refresh()
+            except Exception as e:
+                logger.warning(f"Background refresh of {key} failed: {e}")
+            finally:
+                self._refreshes.pop(key, None)
+
+        self._refreshes[key] = asyncio.create_task(run())
+
+    def is_possibly_stale(self, key: Any) -> bool:
+        """True while a background refresh for `key` (a list id, or "lists") is pending."""
+        return key in self._refreshes
+
+    async def wait_for_refreshes(self):
+        """Await all pending background refreshes (used at shutdown and in tests)."""
+        while self._refreshes:
+            await asyncio.gather(*list(self._refreshes.values()), return_exceptions=True)
+
+    def _drop_list(self, list_id: int):
+        """Forget a list everywhere (memory and mirror) after an ambiguous mutation."""
+        self._note_mutation(list_id)
+        self.list_content_cache.pop(list_id, None)
+        if self.mirror is not None:
+            self.mirror.delete_list(list_id)
+
+    def _patch_cached_task(self, list_id: int, task: Any):
+        """
+        Write-through: apply the Task (or list of Tasks, e.g. subtasks closed with their
+        parent) returned by a mutation to the cached list. Ambiguous responses (raw
+        status, foreign list) drop the cached list instead.
+        """
+        self._note_mutation(list_id)
+        entry = self.list_content_cache.peek(list_id)
+        if entry is None:
+            return
+        tasks = task if isinstance(task, list) else [task]
+        if not tasks or any(not isinstance(t, Task) or t.checklist_id not in (None, list_id) for t in tasks):
+            self._drop_list(list_id)
+            return
+        merged = [entry.upsert(t) for t in tasks]
+        self.list_content_cache.trim()
+        if self.mirror is not None:
+            self.mirror.upsert_tasks(list_id, merged)
+        # The shared copy was tombstoned by _note_mutation; republishing the whole list per
+        # patch would cost O(list) each time, so it is republished by the next sync instead
 
     async def invalidate_cache(self, list_id: Optional[int] = None):
         """Invalidate specific list cache or all caches."""
         if list_id:
-            self.list_content_cache.pop(list_id, None)
+            self._drop_list(list_id)
         else:
             self.list_content_cache.clear()
             self.list_cache.clear()
+            self._checklists = None
+            self.not_found.clear()
+            self._epoch += 1
+            if self.mirror is not None:
+                self.mirror.clear()
+            if self.shared is not None:
+                self.shared.clear()
+
+    def invalidate_checklists(self):
+        """Drop cached checklist metadata (after create/rename/delete of a list)."""
+        self.list_cache.clear()
+        self._checklists = None
+        for key in [k for k in self.not_found if k[1] is None]:
+            self.not_found.pop(key, None)
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Counters and per-entry details for every cache layer (see checkvist://stats/cache)."""
+        content = self.list_content_cache
+        checklists_age = None
+        if self._checklists is not None:
+            checklists_age = round(self.list_cache.timer() - self._checklists[1], 1)
+        return {
+            "checklists": {
+                **self.checklist_stats,
+                "cached": "lists" in self.list_cache,
+                "age": checklists_age,
+                "ttl": self.list_cache.ttl,
+            },
+            "list_content": {
+                **content.stats(),
+                "ttl": content.ttl,
+                "max_bytes": content.max_bytes,
+                "policy": content.policy,
+                "lists": content.describe(),
+            },
+            "not_found": {"entries": len(self.not_found), "hits": self.not_found_hits, "ttl": self.not_found.ttl},
+            "stale_grace": self.stale_grace,
+            "pending_refreshes": [str(key) for key in self._refreshes],
+            "sync": dict(self.sync_stats),
+            "search": {**self.search_stats, "indexed_tasks": len(self.search_index),
+                       "bytes": self.search_index.nbytes()},
+            "mirror": self.mirror.path if self.mirror is not None else None,
+            "shared": {"path": self.shared.path, "entries": self.shared.entries()} if self.shared is not None else None,
+        }
 
     async def search_tasks(self, query: str) -> List[Dict[str, Any]]:
-        """Enhanced search using Checkvist's native global index."""
+        """
+        Search task content and tags across all lists. Lists that are cached, current and
+        indexed are answered from the local word and trigram index; Checkvist's native global
+        index is only asked when some list is not, and only its hits in those lists are kept.
+        """
+        lists = await self.get_checklists()
+        local_matches, remaining = self._search_local(query, lists)
+        if not remaining:
+            self.search_stats["local"] += 1
+            return self._truncate_list(local_matches, limit=10)
+        self.search_stats["upstream"] += 1
+        answered = {cl.id for cl in lists} - {cl.id for cl in remaining}
         client = await self._get_authed_client()
         
         # Use high-performance global search
         raw_results = await client.search_global(query)
         
         # Enrich results with breadcrumbs and indicators
-        all_matches = []
+        all_matches = local_matches
         
         # Group results by checklist to fetch trees efficiently
         by_list = {}
         for r in raw_results:
             l_id = r.checklist_id
-            if l_id:
+            if l_id and l_id not in answered:
                 if l_id not in by_list: by_list[l_id] = []
                 by_list[l_id].append(r)
         
         for l_id, tasks in by_list.items():
             try:
                 # Fetch full list to build breadcrumbs efficiently
-                all_tasks = await client.get_tasks(l_id)
-                task_map = {t.id: t for t in all_tasks}
+                entry = await self._get_list_entry(l_id)
+                crumbs = _breadcrumbs(entry)
                 
-                # Pre-calculate children count
-                children_map = {}
-                for t in all_tasks:
-                    pid = t.parent_id
-                    if pid:
-                        children_map[pid] = children_map.get(pid, 0) + 1
+                # The hierarchy survives content-only patches of the cached list
+                tree = entry.derived("tree", _build_tree_index)
                 
                 list_name = await self.get_list_name(l_id)
                 
                 for task in tasks:
-                    t_id = task.id
-                    # Indicators via Pydantic model
-                    child_count = children_map.get(t_id, 0)
-                    
-                    indicators = []
-                    if task.has_notes: indicators.append("[N]")
-                    if task.has_comments: indicators.append("[C]")
-                    if child_count > 0: indicators.append(f"[F: {child_count}]")
-                    ind_str = " ".join(indicators) + " " if indicators else ""
-                    
-                    # Metadata string from models
-                    meta = []
-                    if task.priority > 0: 
-                        meta.append(f"!{task.priority}")
-                    if task.due_date: meta.append(f"^{task.due_date}")
-                    for tag in task.tags:
-                         if tag != "deleted": meta.append(f"#{tag}")
-                    meta_str = " " + " ".join(meta) if meta else ""
-                    
-                    task_dict = task.model_dump()
-                    task_dict["list_name"] = list_name
-                    task_dict["list_id"] = l_id
-                    task_dict["breadcrumb"] = f"{ind_str}{self._build_breadcrumb_from_map(t_id, task_map)}{meta_str}"
-                    all_matches.append(task_dict)
+                    all_matches.append(_search_hit(task, l_id, list_name, crumbs, tree))
             except Exception as e:
                 logger.error(f"Search enrichment failed for list {l_id}: {e}")
                 # Fallback: add raw results if enrichment fails
@@ -117,32 +558,80 @@ class CheckvistService:
                     
         if not all_matches and len(query) >= 3:
             logger.info(f"Global search returned no results for '{query}', falling back to local list iteration.")
-            lists = await self.get_checklists()
             
             async def process_list_local(cl):
                 try:
-                    tasks = await client.get_tasks(cl.id)
+                    entry = await self._get_list_entry(cl.id)
                     query_lower = query.lower()
                     matches = []
-                    task_map = {t.id: t for t in tasks}
-                    for task in tasks:
+                    crumbs = _breadcrumbs(entry)
+                    for task in entry.task_list():
                         content_match = query_lower in task.content.lower()
                         tag_match = any(query_lower in t.lower() for t in task.tags)
                         if content_match or tag_match:
                             task_dict = task.model_dump()
                             task_dict["list_name"] = cl.name
                             task_dict["list_id"] = cl.id
-                            task_dict["breadcrumb"] = self._build_breadcrumb_from_map(task.id, task_map)
+                            task_dict["breadcrumb"] = crumbs.path(task.id)
                             matches.append(task_dict)
                     return matches
                 except: return []
 
-            local_results = await asyncio.gather(*[process_list_local(cl) for cl in lists])
+            local_results = await asyncio.gather(*[process_list_local(cl) for cl in remaining])
             for matches in local_results:
                 all_matches.extend(matches)
                     
         return self._truncate_list(all_matches, limit=10)
 
+    def _search_local(self, query: str,
+                      lists: List[Checklist]) -> Tuple[List[Dict[str, Any]], List[Checklist]]:
+        """
+        Search the local index over the lists it can answer for, returning the hits and the
+        checklists left for upstream: lists not cached, cached past their TTL and not vouched
+        for by the current checklist markers, or still being indexed (a blank query leaves
+        them all). Lists of up to `search_inline_tasks` tasks are (re)indexed here, larger
+        ones in the background, so no request pays for a large build.
+        """
+        if not query.strip():
+            return [], lists
+        entries: Dict[int, CachedList] = {}
+        remaining = []
+        for cl in lists:
+            entry = self.list_content_cache.peek(cl.id)
+            marker = self._current_marker(cl.id)
+            if entry is None or (not self.list_content_cache.is_fresh(entry) and
+                                 (marker is None or marker != entry.marker)):
+                remaining.append(cl)
+                continue
+            if not self.search_index.can_refresh(entry) and len(entry) > self.search_inline_tasks:
+                self._schedule_refresh(("search_index", cl.id), lambda e=entry: self._index_in_background(e))
+                remaining.append(cl)
+                continue
+            self.search_index.refresh(entry)
+            entries[cl.id] = entry
+        hits = self.search_index.search(query, entries)
+        by_list: Dict[int, List[int]] = {}
+        for l_id, t_id in hits:
+            by_list.setdefault(l_id, []).append(t_id)
+        results = []
+        for cl in lists:
+            entry = entries.get(cl.id)
+            if entry is None or cl.id not in by_list:
+                continue
+            _, positions = entry.derived("api_positions", _api_positions)
+            crumbs = _breadcrumbs(entry)
+            tree = entry.derived("tree", _build_tree_index)
+            for t_id in sorted(by_list[cl.id], key=positions.__getitem__):
+                results.append(_search_hit(entry.tasks[t_id], cl.id, cl.name, crumbs, tree))
+        return results, remaining
+
+    async def _index_in_background(self, entry: CachedList):
+        """Index a large cached list in batches, yielding to the event loop in between."""
+        if self.list_content_cache.peek(entry.list_id) is not entry:
+            return  # evicted or replaced since it was scheduled
+        for _ in self.search_index.build(entry):
+            await asyncio.sleep(0)
+
     def _truncate_list(self, items: List[Any], limit: int = 100) -> List[Any]:
         """
         [B1] Context Guard: Truncate list if it exceeds the safety limit.
@@ -157,12 +646,19 @@ class CheckvistService:
     async def bulk_tag_tasks(self, list_id: int, task_ids: List[int], tags: str):
         """Service wrapper for bulk tagging."""
         client = await self._get_authed_client()
-        return await client.bulk_tag_tasks(list_id, task_ids, tags)
+        try:
+            return await client.bulk_tag_tasks(list_id, task_ids, tags)
+        finally:
+            self._drop_list(list_id)
 
     async def bulk_move_tasks(self, list_id: int, task_ids: List[int], target_list_id: int, target_parent_id: int = None):
         """Service wrapper for bulk moving."""
         client = await self._get_authed_client()
-        return await client.bulk_move_tasks(list_id, task_ids, target_list_id, target_parent_id)
+        try:
+            return await client.bulk_move_tasks(list_id, task_ids, target_list_id, target_parent_id)
+        finally:
+            self._drop_list(list_id)
+            self._drop_list(target_list_id)
 
     async def set_task_styling_by_priority(self, list_id: int, task_id: int, priority: int):
         """Maps numeric priority to visual styling (marks)."""
@@ -171,22 +667,37 @@ class CheckvistService:
         # Checkvist usually supports up to fg9 (grey/neutral)
         if 1 <= priority <= 9:
             mark = f"fg{priority}"
-            return await client.set_task_styling(list_id, task_id, mark=mark)
         elif priority == 0:
-            return await client.set_task_styling(list_id, task_id, mark="fg9")
-        return None
+            mark = "fg9"
+        else:
+            return None
+        result = await client.set_task_styling(list_id, task_id, mark=mark)
+        # The mark doubles as the task priority in list payloads
+        self._drop_list(list_id)
+        return result
 
     async def get_task_enriched(self, list_id: int, task_id: int, include_children: bool = False, depth: int = 2) -> Dict[str, Any]:
-        """Fetch task details including notes, comments, and optional child tree."""
-        client = await self._get_authed_client()
-        task = await client.get_task(list_id, task_id)
-        if isinstance(task, list) and task:
-            task = task[0]
+        """
+        Fetch task details including notes, comments, and optional child tree.
+        A fresh cached list already carries the task with notes (with_notes=true), so no
+        request is made; otherwise the task and its list are fetched concurrently.
+        """
+        self._check_not_found(list_id, task_id)
+        cached = self.list_content_cache.peek(list_id)
+        if cached is not None and self.list_content_cache.is_fresh(cached) and task_id in cached.tasks:
+            entry = self.list_content_cache.get(list_id)
+            task = entry.tasks[task_id]
+        else:
+            client = await self._get_authed_client()
+            task, entry = await asyncio.gather(
+                self._remember_not_found((list_id, task_id), client.get_task(list_id, task_id)),
+                self._get_list_entry(list_id, require_task=task_id),
+            )
+            if isinstance(task, list) and task:
+                task = task[0]
         
         # Build breadcrumbs (requires list context)
-        all_tasks = await client.get_tasks(list_id)
-        task_map = {t.id: t for t in all_tasks}
-        breadcrumb = self._build_breadcrumb_from_map(task_id, task_map)
+        breadcrumb = _breadcrumbs(entry).path(task_id)
         
         # Prepare result
         result = {
@@ -197,35 +708,13 @@ class CheckvistService:
             "children_tree": None
         }
         
-        if include_children:
-            # Build hierarchy for the branch
-            task_nodes = {t.id: {'data': t, 'children': []} for t in all_tasks}
-            for t in all_tasks:
-                pid = t.parent_id
-                if pid and pid in task_nodes:
-                    task_nodes[pid]['children'].append(task_nodes[t.id])
-            
-            if task_id in task_nodes:
-                def truncate_tree(node, current_depth):
-                    if current_depth >= depth:
-                        return {"data": node['data'].model_dump(), "children": [], "truncated": True}
-                    return {
-                        "data": node['data'].model_dump(),
-                        "children": [truncate_tree(c, current_depth + 1) for c in node['children']]
-                    }
-                result["children_tree"] = truncate_tree(task_nodes[task_id], 0)
+        if include_children and task_id in entry.tasks:
+            # Branch below the task, from the list's cached hierarchy
+            tree = entry.derived("tree", _build_tree_index)
+            result["children_tree"] = _nest(entry.tasks, tree.walk([task_id], max_depth=depth), truncate_at=depth)[0]
                 
         return result
 
-    def _build_breadcrumb_from_map(self, task_id: int, task_map: Dict[int, Task]) -> str:
-        path = []
-        current = task_map.get(task_id)
-        while current:
-            path.insert(0, current.content)
-            pid = current.parent_id
-            current = task_map.get(pid) if pid else None
-        return " > ".join(path)
-
     async def import_tasks_smart(self, list_id: int, content: str, parent_id: Optional[int] = None) -> List[Task]:
         """
         Import tasks in bulk, then polyfill features not supported by native import (^date, @user).
@@ -237,15 +726,17 @@ class CheckvistService:
 
         # 1. Native import (handles hierarchy, tags, priority)
         await client.import_tasks(list_id, content, parent_id)
+        self._drop_list(list_id)
         
         # Checkvist import returns raw status for bulk ops. 
         # We need to re-fetch the list to get the new tasks and polyfill them.
         # This is a bit inefficient but necessary because native bulk import doesn't return created IDs.
-        all_tasks = await client.get_tasks(list_id)
+        all_tasks = await self.get_tasks(list_id)
         
         # We try to find the newly imported tasks.
         # For simplicity, we filter for tasks without due dates that match the input content lines.
         lines = content.strip().split("\n")
+        polyfilled = False
         
         # Only polyfill if we find matches. 
         # This is a "best effort" polyfill.
@@ -266,50 +757,44 @@ class CheckvistService:
                 
                 if update_data:
                     await client.update_task(list_id, match.id, **update_data)
+                    polyfilled = True
         
+        if polyfilled:
+            self._drop_list(list_id)
         return all_tasks
 
     async def move_task_hierarchical(self, list_id: int, task_id: int, target_list_id: int, target_parent_id: Optional[int] = None):
         """Logic for recursive move to prevent hierarchy loss (Fix BUG-004)."""
         client = await self._get_authed_client()
-        result = await client.move_task_hierarchy(list_id, task_id, target_list_id, target_parent_id)
-        return result
+        try:
+            return await client.move_task_hierarchy(list_id, task_id, target_list_id, target_parent_id)
+        finally:
+            # Also on CheckvistPartialSuccessError: the task already left the source list
+            self._drop_list(list_id)
+            self._drop_list(target_list_id)
 
     async def reopen_task(self, list_id: int, task_id: int) -> Task:
         """Reopen a task with robust response handling."""
         client = await self._get_authed_client()
         response = await client.reopen_task(list_id, task_id)
-        
+        # Subtasks reopened with the task follow it in the response
+        self._patch_cached_task(list_id, response)
         # Handle list-wrapped response
         if isinstance(response, list) and len(response) > 0:
-            return response[0]
+            response = response[0]
         return response
 
     async def archive_task(self, list_id: int, task_id: int) -> str:
         """Recursive archiving with robust tag and response handling (Fix BUG-002)."""
         client = await self._get_authed_client()
-        # Invalidate cache for this list
-        if list_id in self.list_content_cache:
-            self.list_content_cache.pop(list_id, None)
-        all_tasks = await client.get_tasks(list_id)
+        entry = await self._get_list_entry(list_id, require_task=task_id)
         
         # 1. Identify target task and its descendants
-        target_task = next((t for t in all_tasks if t.id == task_id), None)
-        if not target_task:
+        if task_id not in entry.tasks:
             raise ValueError(f"Task {task_id} not found in list {list_id}")
             
-        def get_descendants(pid, tasks):
-            descendants = []
-            pid = str(pid) # Normalize for comparison
-            for t in tasks:
-                t_pid = str(t.parent_id) if t.parent_id is not None else ""
-                if t_pid == pid:
-                    descendants.append(t)
-                    descendants.extend(get_descendants(t.id, tasks))
-            return descendants
-            
-        descendants = get_descendants(task_id, all_tasks)
-        targets = [target_task] + descendants
+        tree = entry.derived("tree", _build_tree_index)
+        targets = [entry.tasks[t_id] for t_id in tree.subtree(task_id)]
         
         # 2. Apply tag to all
         count = 0
@@ -319,80 +804,243 @@ class CheckvistService:
             try:
                 if "deleted" not in t.tags:
                     new_tags = t.tags + ["deleted"]
-                    await client.update_task(list_id, t.id, tags=",".join(new_tags))
+                    updated = await client.update_task(list_id, t.id, tags=",".join(new_tags))
+                    self._patch_cached_task(list_id, updated)
                     count += 1
             except Exception as e:
                 logger.error(f"Failed to archive task {t.id}: {e}")
                 errors.append(f"Task {t.id} ({t.content}): {e}")
-                
+        
+        if errors:
+            # A failed update may still have been applied upstream
+            self._drop_list(list_id)
         summary = f"Archived {count}/{len(targets)} tasks."
         if errors:
             error_details = "\n- ".join(errors)
             return f"{summary}\n\n> [!WARNING]\n> {len(errors)} tasks failed to archive:\n- {error_details}"
                 
-        return f"Task {task_id} and its {len(descendants)} descendants successfully archived ({count} items updated)."
+        return f"Task {task_id} and its {len(targets) - 1} descendants successfully archived ({count} items updated)."
 
     async def add_task(self, list_id: int, content: str, parent_id: int = None, parse: bool = True) -> Task:
         client = await self._get_authed_client()
-        # Invalidate cache for this list
-        if list_id in self.list_content_cache:
-            self.list_content_cache.pop(list_id, None)
         task = await client.add_task(list_id, content, parent_id=parent_id, parse=parse)
+        self._patch_cached_task(list_id, task)
         return task
 
     async def update_task(self, list_id: int, task_id: int, **kwargs) -> Task:
         client = await self._get_authed_client()
-        # Invalidate cache for this list
-        if list_id in self.list_content_cache:
-            self.list_content_cache.pop(list_id, None)
         task = await client.update_task(list_id, task_id, **kwargs)
+        self._patch_cached_task(list_id, task)
         return task
 
-    async def move_task(self, list_id: int, task_id: int, target_list_id: int, target_parent_id: Optional[int] = None) -> Task:
+    async def close_task(self, list_id: int, task_id: int) -> Task:
         client = await self._get_authed_client()
-        # Invalidate cache for source and target lists
-        if list_id in self.list_content_cache:
-            self.list_content_cache.pop(list_id, None)
-        if target_list_id in self.list_content_cache:
-            self.list_content_cache.pop(target_list_id, None)
-        task = await client.move_task(list_id, task_id, target_list_id, target_parent_id)
+        task = await client.close_task(list_id, task_id)
+        # Subtasks closed with the task follow it in the response
+        self._patch_cached_task(list_id, task)
+        if isinstance(task, list) and len(task) > 0:
+            task = task[0]
         return task
 
-    async def get_tree(self, list_id: int, depth: int = 1) -> List[Dict[str, Any]]:
+    async def add_note(self, list_id: int, task_id: int, note: str):
         client = await self._get_authed_client()
-        tasks = await client.get_tasks(list_id)
-        
-        # Build hierarchy
-        task_nodes = {t.id: {'data': t, 'children': []} for t in tasks}
-        roots = []
-        
-        for t in tasks:
-            if "deleted" in t.tags: 
-                # logger.debug(f"Skipping deleted task {t.id} ({t.content})")
-                continue
-            
-            pid = t.parent_id
-            # Normalize root detection (Fix BUG-003)
-            is_root = pid is None or pid == 0 or pid == ""
-            
-            if is_root:
-                roots.append(task_nodes[t.id])
-            elif pid in task_nodes:
-                task_nodes[pid]['children'].append(task_nodes[t.id])
-            # Else: Orphaned task (parent excluded/archived), so we hide it too.
-
-        # Apply depth truncation recursively
-        def truncate_node(node, current_depth):
-            if current_depth >= depth - 1:
-                return {'data': node['data'].model_dump(), 'children': []}
-            
-            return {
-                'data': node['data'].model_dump(),
-                'children': [truncate_node(child, current_depth + 1) for child in node['children']]
-            }
+        comment = await client.add_note(list_id, task_id, note)
+        self._note_mutation(list_id)
+        # Notes are part of the cached task payload (with_notes=true)
+        entry = self.list_content_cache.peek(list_id)
+        if entry is not None:
+            if isinstance(comment, Comment):
+                if entry.add_comment(task_id, comment.model_dump()):
+                    self.list_content_cache.trim()
+                    if self.mirror is not None:
+                        self.mirror.upsert_tasks(list_id, [entry.tasks[task_id]])
+            else:
+                self._drop_list(list_id)
+        return comment
 
-        truncated_roots = [truncate_node(root, 0) for root in roots]
-        return self._truncate_list(truncated_roots, limit=50) # Tighter limit for tree structures
+    async def import_tasks(self, list_id: int, content: str, parent_id: Optional[int] = None):
+        """Native bulk import. The response is a raw status, so the cached list is dropped."""
+        client = await self._get_authed_client()
+        try:
+            return await client.import_tasks(list_id, content, parent_id)
+        finally:
+            self._drop_list(list_id)
+
+    async def move_task(self, list_id: int, task_id: int, target_parent_id: Optional[int] = None) -> Task:
+        """Re-parent a task within the same list (cross-list moves use move_task_hierarchical)."""
+        client = await self._get_authed_client()
+        task = await client.move_task(list_id, task_id, target_parent_id)
+        self._patch_cached_task(list_id, task)
+        return task
+
+    async def get_list_tree(self, list_id: int) -> Tuple[Dict[int, Task], TreeIndex]:
+        """Cached tasks by id (read-only) plus the list's TreeIndex, rebuilt only on structural changes."""
+        entry = await self._get_list_entry(list_id)
+        return entry.tasks, entry.derived("tree", _build_tree_index)
+
+    async def get_breadcrumbs(self, list_id: int) -> BreadcrumbIndex:
+        """
+        Memoized breadcrumb paths for a list, shared until the list is next patched or synced.
+        `.tasks` is the cached task map of the same snapshot (read-only).
+        """
+        return _breadcrumbs(await self._get_list_entry(list_id))
+
+    async def get_tree(self, list_id: int, depth: int = 1) -> List[Dict[str, Any]]:
+        entry = await self._get_list_entry(list_id)
+        tree = entry.derived("tree", _build_tree_index)
+        tasks = entry.tasks
+        # Deleted tasks are hidden with their subtree; orphans (parent excluded/archived) too
+        walked = tree.walk(tree.roots, max_depth=max(depth - 1, 0), prune=lambda t_id: "deleted" in tasks[t_id].tags)
+        return self._truncate_list(_nest(tasks, walked), limit=50) # Tighter limit for tree structures
+
+    async def get_subtree(self, list_id: int, task_id: int, depth: int = 1) -> List[Dict[str, Any]]:
+        """
+        Like get_tree, but rooted at one task: a one-element nested tree ([] if the task is
+        archived). Walks only that branch of the cached TreeIndex, O(subtree).
+        """
+        entry = await self._get_list_entry(list_id)
+        tree = entry.derived("tree", _build_tree_index)
+        tasks = entry.tasks
+        if task_id not in tree:
+            raise CheckvistResourceNotFoundError(f"Task {task_id} not found in list {list_id}", status_code=404)
+        walked = tree.walk([task_id], max_depth=max(depth - 1, 0), prune=lambda t_id: "deleted" in tasks[t_id].tags)
+        return self._truncate_list(_nest(tasks, walked), limit=50)
+
+    async def get_tree_page(self, list_id: int, depth: int = 1, cursor: Optional[str] = None,
+                            page_size: int = 100, root_task_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        One page of the tree in preorder as flat (task dict, level) items, with the cursor of
+        the next page. Served from the cached TreeIndex: O(page), no refetch between pages.
+        With `root_task_id`, pages only that task's subtree; levels are relative to it.
+        """
+        entry = await self._get_list_entry(list_id)
+        tree = entry.derived("tree", _build_tree_index)
+        tasks = entry.tasks
+        if root_task_id is not None and root_task_id not in tree.pre:
+            if root_task_id in tree:
+                raise ValueError(f"Task {root_task_id} is part of a parent cycle and cannot be paged.")
+            raise CheckvistResourceNotFoundError(f"Task {root_task_id} not found in list {list_id}", status_code=404)
+        ids, next_position = tree.page(
+            _cursor_start(cursor, tree.pre), max(page_size, 1),
+            max_depth=max(depth - 1, 0), hidden=lambda t_id: "deleted" in tasks[t_id].tags, root=root_task_id
+        )
+        return {
+            "items": [(tasks[t_id].model_dump(), tree.level(t_id, root_task_id)) for t_id in ids],
+            "next_cursor": _encode_cursor(tree.preorder, next_position),
+        }
+
+    async def get_tree_within_budget(self, list_id: int, budget_chars: int, expand_by: str = "priority",
+                                     root_task_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Size-aware alternative to depth limits: the outline (roots, or one task) is expanded
+        breadth-first until its rendered lines would exceed `budget_chars`. Within a level,
+        nodes are expanded by `expand_by`: "priority" (!1 first), "recency" (latest
+        updated_at first) or "order" (list order). Returns (task dict, level, folded child
+        count) items in preorder, the number of top-level tasks left out and the size used.
+        """
+        if expand_by not in ("priority", "recency", "order"):
+            raise ValueError(f"Unknown expand_by '{expand_by}'. Use priority, recency or order.")
+        entry = await self._get_list_entry(list_id)
+        tree = entry.derived("tree", _build_tree_index)
+        tasks = entry.tasks
+        if root_task_id is not None and root_task_id not in tree:
+            raise CheckvistResourceNotFoundError(f"Task {root_task_id} not found in list {list_id}", status_code=404)
+        starts = [root_task_id] if root_task_id is not None else tree.roots
+
+        def hidden(t_id: int) -> bool:
+            return "deleted" in tasks[t_id].tags
+
+        def cost(t_id: int, level: int, folded: int) -> int:
+            return len(task_line(tasks[t_id].model_dump(), level, folded=folded)) + 1
+
+        ranks = {
+            "priority": lambda t_id: tasks[t_id].priority or 99,
+            "recency": lambda t_id: -int(timestamp_key(tasks[t_id].updated_at) or 0),
+            "order": None,
+        }
+        shown, expanded, used = tree.expand(starts, budget_chars, cost, rank=ranks[expand_by], hidden=hidden)
+        shown_set = set(shown)
+        walked = tree.walk(shown, prune=lambda t_id: t_id not in shown_set
+                           and (tree.parent[t_id] not in expanded or hidden(t_id)))
+        items = []
+        for t_id, level in walked:
+            folded = 0 if t_id in expanded else sum(1 for c in tree.children.get(t_id, ()) if not hidden(c))
+            items.append((tasks[t_id].model_dump(), level, folded))
+        return {
+            "items": items,
+            "omitted": sum(1 for t_id in starts if not hidden(t_id)) - len(shown),
+            "chars": used,
+        }
+
+    async def get_changes(self, list_id: int, since: Optional[str] = None) -> Dict[str, Any]:
+        """
+        What changed in a list since the snapshot `since` (a token returned by an earlier
+        call), computed by diff_snapshots against the current (cached or synced) content.
+        Always returns the token of the current snapshot to pass next time; without `since`
+        there is nothing to compare and `changes` is None. Raises ValueError for an unknown
+        or expired token. When the base snapshot is still in memory, only the tasks its
+        Merkle hashes single out are compared.
+        """
+        base, base_merkle = None, None
+        if since:
+            base, base_merkle = self._load_snapshot(list_id, since)
+            if base is None:
+                raise ValueError(f"Unknown or expired snapshot '{since}'. Call without 'since' to start over.")
+        entry = await self._get_list_entry(list_id)
+        current = entry.derived("snapshot", lambda e: snapshot(e.tasks.values()), structural=False)
+        merkle = _merkle(entry)
+        changes = None
+        if base is not None:
+            candidates = merkle.changed(base_merkle) if base_merkle is not None else None
+            changes = diff_snapshots(base, current, candidates)
+        return {"since": self._store_snapshot(list_id, current, merkle), "changes": changes}
+
+    def _store_snapshot(self, list_id: int, current: Snapshot, merkle: MerkleIndex) -> str:
+        stored = self.snapshots.setdefault(list_id, OrderedDict())
+        if stored:
+            token, (_, latest, _) = next(reversed(stored.items()))
+            if latest is current:  # same list version as the last token handed out
+                return token
+        token = f"{time.time_ns():x}"
+        taken_at = time.time()
+        stored[token] = (taken_at, current, merkle.copy())
+        while len(stored) > self.snapshots_per_list:
+            stored.popitem(last=False)
+        if self.mirror is not None:
+            self.mirror.save_snapshot(list_id, token, taken_at, current, keep=self.snapshots_per_list)
+        return token
+
+    def _load_snapshot(self, list_id: int, token: str) -> Tuple[Optional[Snapshot], Optional[MerkleIndex]]:
+        stored = self.snapshots.get(list_id, {}).get(token)
+        if stored is not None:
+            return stored[1], stored[2]
+        if self.mirror is not None:
+            return self.mirror.load_snapshot(list_id, token), None
+        return None, None
+
+    async def get_tasks_page(self, list_id: int, cursor: Optional[str] = None,
+                             page_size: int = 100) -> Dict[str, Any]:
+        """
+        One page of the list's visible (non-deleted) tasks in API order, with their breadcrumbs
+        and the cursor of the next page.
+        """
+        entry = await self._get_list_entry(list_id)
+        order, positions = entry.derived("api_positions", _api_positions)
+        crumbs = _breadcrumbs(entry)
+        tasks = entry.tasks
+        items = []
+        position = _cursor_start(cursor, positions)
+        while position < len(order) and len(items) < max(page_size, 1):
+            task = tasks[order[position]]
+            position += 1
+            if "deleted" not in task.tags:
+                items.append((task, crumbs.path(task.id)))
+        while position < len(order) and "deleted" in tasks[order[position]].tags:
+            position += 1
+        return {
+            "items": items,
+            "next_cursor": _encode_cursor(order, position if position < len(order) else None),
+        }
 
     async def get_weekly_summary(self) -> str:
         """
@@ -401,7 +1049,6 @@ class CheckvistService:
         """
         from datetime import datetime, timedelta
         
-        client = await self._get_authed_client()
         checklists = await self.get_checklists()
         
         now = datetime.utcnow()
@@ -416,7 +1063,7 @@ class CheckvistService:
         for cl in checklists[:10]:
             await asyncio.sleep(0.05)
             try:
-                tasks = await client.get_tasks(cl.id)
+                tasks = await self.get_tasks(cl.id)
                 for t in tasks:
                     if "deleted" in t.tags: continue
                     
@@ -0,0 +1,179 @@
+import json
+import mmap
+import os
+import struct
+import zlib
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Optional
+from .models import Task
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"CVSHM001"
+_HEADER = struct.Struct("<8sIIQQ")  # magic, version, slot count, data size, ring head
+_SLOT = struct.Struct("<qdQII")     # list id (0 = free), synced_at, offset, length (0 = tombstone), crc32
+_VERSION = 1
+
+
+class SharedListCache:
+    """
+    Host-wide cache of list snapshots in a memory-mapped file, shared by every
+    server process that points at the same path.
+
+    Layout: header, a fixed slot table, then a ring buffer of zlib-compressed JSON
+    blobs ({"tasks", "watermark", "marker"}). Writers take an exclusive flock, readers
+    a shared one; each blob carries a crc32 so a slot whose bytes were overwritten by
+    the ring is treated as a miss. `synced_at` is wall-clock time and only moves
+    forward: a put older than what is stored (e.g. a slow fetch finishing after another
+    process patched or dropped the list) is rejected. Deletes leave a tombstone for
+    the same reason.
+    """
+
+    def __init__(self, path: str, size_mb: int = 64, slots: int = 256):
+        if fcntl is None:
+            raise RuntimeError("The shared list cache requires POSIX file locking (fcntl)")
+        self.path = path
+        self.slots = slots
+        self._data_start = _HEADER.size + slots * _SLOT.size
+        total = self._data_start + size_mb * 1024 * 1024
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._file = os.fdopen(fd, "r+b")
+        with self._lock(fcntl.LOCK_EX):
+            if os.fstat(fd).st_size < total:
+                self._file.truncate(total)
+            self._map = mmap.mmap(fd, 0)
+            magic, version, n_slots, _, _ = _HEADER.unpack_from(self._map, 0)
+            if magic != _MAGIC or version != _VERSION or n_slots != slots:
+                self._format(len(self._map) - self._data_start)
+            # Another process may have created a larger file: keep its layout
+            self._data_size = _HEADER.unpack_from(self._map, 0)[3]
+
+    def _format(self, data_size: int):
+        logger.info(f"Initialising shared list cache {self.path}")
+        self._map[:self._data_start] = b"\0" * self._data_start
+        _HEADER.pack_into(self._map, 0, _MAGIC, _VERSION, self.slots, data_size, 0)
+
+    @contextmanager
+    def _lock(self, mode: int):
+        fcntl.flock(self._file.fileno(), mode)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def _slot(self, index: int):
+        return _SLOT.unpack_from(self._map, _HEADER.size + index * _SLOT.size)
+
+    def _write_slot(self, index: int, *values):
+        _SLOT.pack_into(self._map, _HEADER.size + index * _SLOT.size, *values)
+
+    def _find(self, list_id: int) -> Optional[int]:
+        for i in range(self.slots):
+            if self._slot(i)[0] == list_id:
+                return i
+        return None
+
+    def get(self, list_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock(fcntl.LOCK_SH):
+            index = self._find(list_id)
+            if index is None:
+                return None
+            _, synced_at, offset, length, crc = self._slot(index)
+            if length == 0:
+                return None
+            start = self._data_start + offset
+            blob = self._map[start:start + length]
+        if zlib.crc32(blob) != crc:
+            return None
+        payload = json.loads(zlib.decompress(blob))
+        marker = payload["marker"]
+        return {
+            "tasks": [Task(**row) for row in payload["tasks"]],
+            "watermark": payload["watermark"],
+            "marker": tuple(marker) if isinstance(marker, list) else marker,
+            "synced_at": synced_at,
+        }
+
+    def synced_at(self, list_id: int) -> Optional[float]:
+        """Sync time of the stored snapshot (a slot read, no decoding), None if absent or tombstoned."""
+        with self._lock(fcntl.LOCK_SH):
+            index = self._find(list_id)
+            if index is None:
+                return None
+            _, synced_at, _, length, _ = self._slot(index)
+        return synced_at if length else None
+
+    def put(self, list_id: int, tasks: Iterable[Task], watermark: str, marker: Any, synced_at: float) -> bool:
+        payload = {"tasks": [t.model_dump(mode="json") for t in tasks], "watermark": watermark, "marker": marker}
+        blob = zlib.compress(json.dumps(payload, separators=(",", ":")).encode())
+        if len(blob) > self._data_size:
+            return False
+        with self._lock(fcntl.LOCK_EX):
+            index = self._find(list_id)
+            if index is not None and self._slot(index)[1] > synced_at:
+                return False
+            head = _HEADER.unpack_from(self._map, 0)[4]
+            if head + len(blob) > self._data_size:
+                head = 0
+            end = head + len(blob)
+            # Free the slots whose blobs the ring is about to overwrite
+            for i in range(self.slots):
+                key, s_at, offset, length, _ = self._slot(i)
+                if key and length and offset < end and head < offset + length:
+                    self._write_slot(i, key, s_at, 0, 0, 0)
+            if index is None:
+                index = self._free_slot()
+            start = self._data_start + head
+            self._map[start:end + self._data_start] = blob
+            self._write_slot(index, list_id, synced_at, head, len(blob), zlib.crc32(blob))
+            _HEADER.pack_into(self._map, 0, _MAGIC, _VERSION, self.slots, self._data_size, end)
+        return True
+
+    def _free_slot(self) -> int:
+        oldest, oldest_at = 0, None
+        for i in range(self.slots):
+            key, synced_at = self._slot(i)[:2]
+            if key == 0:
+                return i
+            if oldest_at is None or synced_at < oldest_at:
+                oldest, oldest_at = i, synced_at
+        return oldest
+
+    def touch(self, list_id: int, synced_at: float) -> bool:
+        """Mark an unchanged stored snapshot as revalidated. False if there is nothing to touch."""
+        with self._lock(fcntl.LOCK_EX):
+            index = self._find(list_id)
+            if index is None:
+                return False
+            key, s_at, offset, length, crc = self._slot(index)
+            if length == 0 or s_at > synced_at:
+                return False
+            self._write_slot(index, key, synced_at, offset, length, crc)
+        return True
+
+    def delete(self, list_id: int, synced_at: float):
+        """Tombstone a list so that older in-flight puts from other processes are rejected."""
+        with self._lock(fcntl.LOCK_EX):
+            index = self._find(list_id)
+            if index is None:
+                index = self._free_slot()
+            self._write_slot(index, list_id, synced_at, 0, 0, 0)
+
+    def clear(self):
+        with self._lock(fcntl.LOCK_EX):
+            self._format(self._data_size)
+
+    def entries(self) -> int:
+        with self._lock(fcntl.LOCK_SH):
+            slots = [self._slot(i) for i in range(self.slots)]
+        return sum(1 for key, _, _, length, _ in slots if key and length)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
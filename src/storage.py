@@ -0,0 +1,191 @@
+import json
+import sqlite3
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from .models import Task, Checklist
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 2
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+    """CREATE TABLE IF NOT EXISTS checklists (
+        id INTEGER PRIMARY KEY, name TEXT NOT NULL, payload TEXT NOT NULL)""",
+    "CREATE TABLE IF NOT EXISTS checklists_state (id INTEGER PRIMARY KEY CHECK (id = 1), synced_at REAL)",
+    """CREATE TABLE IF NOT EXISTS tasks (
+        list_id INTEGER NOT NULL, id INTEGER NOT NULL, parent_id INTEGER, status INTEGER,
+        due TEXT, updated_at TEXT, payload TEXT NOT NULL, PRIMARY KEY (list_id, id))""",
+    "CREATE INDEX IF NOT EXISTS idx_tasks_parent ON tasks (list_id, parent_id)",
+    "CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (list_id, status)",
+    "CREATE INDEX IF NOT EXISTS idx_tasks_due ON tasks (due)",
+    """CREATE TABLE IF NOT EXISTS task_tags (
+        list_id INTEGER NOT NULL, task_id INTEGER NOT NULL, tag TEXT NOT NULL,
+        PRIMARY KEY (list_id, task_id, tag))""",
+    "CREATE INDEX IF NOT EXISTS idx_task_tags_tag ON task_tags (tag)",
+    """CREATE TABLE IF NOT EXISTS sync_state (
+        list_id INTEGER PRIMARY KEY, watermark TEXT, marker TEXT, synced_at REAL)""",
+    """CREATE TABLE IF NOT EXISTS snapshots (
+        list_id INTEGER NOT NULL, token TEXT NOT NULL, taken_at REAL, payload TEXT NOT NULL,
+        PRIMARY KEY (list_id, token))""",
+]
+
+_TABLES = ["meta", "checklists", "checklists_state", "tasks", "task_tags", "sync_state", "snapshots"]
+
+
+class SQLiteMirror:
+    """
+    Optional on-disk mirror of checklists, tasks, tags and sync watermarks.
+    Lets a new server process answer reads from the last session while it
+    revalidates against Checkvist in the background. Timestamps are wall-clock
+    (time.time()) because they must survive restarts.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+            if row is not None and int(row[0]) != SCHEMA_VERSION:
+                # The mirror is a cache: rebuild rather than migrate across versions
+                logger.info(f"SQLite mirror schema {row[0]} != {SCHEMA_VERSION}, rebuilding {self.path}")
+                for table in _TABLES:
+                    self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+            for stmt in _SCHEMA:
+                self.conn.execute(stmt)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),)
+            )
+
+    def close(self):
+        self.conn.close()
+
+    # --- Checklists ---
+
+    def save_checklists(self, lists: List[Checklist], synced_at: float):
+        with self.conn:
+            self.conn.execute("DELETE FROM checklists")
+            self.conn.executemany(
+                "INSERT INTO checklists (id, name, payload) VALUES (?, ?, ?)",
+                [(l.id, l.name, l.model_dump_json()) for l in lists],
+            )
+            self.conn.execute("INSERT OR REPLACE INTO checklists_state (id, synced_at) VALUES (1, ?)", (synced_at,))
+
+    def load_checklists(self) -> Optional[Tuple[List[Checklist], float]]:
+        state = self.conn.execute("SELECT synced_at FROM checklists_state WHERE id = 1").fetchone()
+        if state is None:
+            return None
+        rows = self.conn.execute("SELECT payload FROM checklists ORDER BY rowid").fetchall()
+        return [Checklist.model_validate_json(r[0]) for r in rows], state[0]
+
+    # --- Tasks ---
+
+    def save_list(self, list_id: int, tasks: Iterable[Task], watermark: str, marker: Any, synced_at: float):
+        """Replace the mirrored content of a list (bulk insert in one transaction)."""
+        tasks = list(tasks)
+        with self.conn:
+            self.conn.execute("DELETE FROM tasks WHERE list_id = ?", (list_id,))
+            self.conn.execute("DELETE FROM task_tags WHERE list_id = ?", (list_id,))
+            self._upsert_rows(list_id, tasks)
+            self._save_state(list_id, watermark, marker, synced_at)
+
+    def apply_delta(self, list_id: int, upserted: Iterable[Task], removed_ids: Iterable[int],
+                    watermark: str, marker: Any, synced_at: float):
+        with self.conn:
+            self._delete_rows(list_id, list(removed_ids))
+            self._upsert_rows(list_id, list(upserted))
+            self._save_state(list_id, watermark, marker, synced_at)
+
+    def upsert_tasks(self, list_id: int, tasks: Iterable[Task]):
+        """Write-through of individual task patches (sync state is left untouched)."""
+        with self.conn:
+            self._upsert_rows(list_id, list(tasks))
+
+    def load_list(self, list_id: int) -> Optional[Dict[str, Any]]:
+        state = self.conn.execute(
+            "SELECT watermark, marker, synced_at FROM sync_state WHERE list_id = ?", (list_id,)
+        ).fetchone()
+        if state is None:
+            return None
+        rows = self.conn.execute(
+            "SELECT payload FROM tasks WHERE list_id = ? ORDER BY rowid", (list_id,)
+        ).fetchall()
+        marker = json.loads(state[1]) if state[1] else None
+        return {
+            "tasks": [Task.model_validate_json(r[0]) for r in rows],
+            "watermark": state[0] or "",
+            "marker": tuple(marker) if isinstance(marker, list) else marker,
+            "synced_at": state[2],
+        }
+
+    def delete_list(self, list_id: int):
+        with self.conn:
+            self.conn.execute("DELETE FROM tasks WHERE list_id = ?", (list_id,))
+            self.conn.execute("DELETE FROM task_tags WHERE list_id = ?", (list_id,))
+            self.conn.execute("DELETE FROM sync_state WHERE list_id = ?", (list_id,))
+
+    # --- Snapshots (see src/diff.py) ---
+
+    def save_snapshot(self, list_id: int, token: str, taken_at: float, snapshot: Dict[int, Dict[str, Any]],
+                      keep: int = 8):
+        """Store a list snapshot under `token`, keeping only the `keep` most recent per list."""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO snapshots (list_id, token, taken_at, payload) VALUES (?, ?, ?, ?)",
+                (list_id, token, taken_at, json.dumps(list(snapshot.items()))),
+            )
+            self.conn.execute(
+                """DELETE FROM snapshots WHERE list_id = ? AND token NOT IN (
+                     SELECT token FROM snapshots WHERE list_id = ? ORDER BY taken_at DESC LIMIT ?)""",
+                (list_id, list_id, keep),
+            )
+
+    def load_snapshot(self, list_id: int, token: str) -> Optional[Dict[int, Dict[str, Any]]]:
+        row = self.conn.execute(
+            "SELECT payload FROM snapshots WHERE list_id = ? AND token = ?", (list_id, token)
+        ).fetchone()
+        return {t_id: fields for t_id, fields in json.loads(row[0])} if row is not None else None
+
+    def clear(self):
+        """Drop cached data. Snapshots are history handed out to clients and are kept."""
+        with self.conn:
+            for table in ("checklists", "checklists_state", "tasks", "task_tags", "sync_state"):
+                self.conn.execute(f"DELETE FROM {table}")
+
+    def _upsert_rows(self, list_id: int, tasks: List[Task]):
+        if not tasks:
+            return
+        self.conn.executemany(
+            """INSERT INTO tasks (list_id, id, parent_id, status, due, updated_at, payload)
+               VALUES (?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (list_id, id) DO UPDATE SET
+                 parent_id = excluded.parent_id, status = excluded.status, due = excluded.due,
+                 updated_at = excluded.updated_at, payload = excluded.payload""",
+            [(list_id, t.id, t.parent_id, t.status, t.due_date, t.updated_at, t.model_dump_json()) for t in tasks],
+        )
+        self.conn.executemany(
+            "DELETE FROM task_tags WHERE list_id = ? AND task_id = ?", [(list_id, t.id) for t in tasks]
+        )
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO task_tags (list_id, task_id, tag) VALUES (?, ?, ?)",
+            [(list_id, t.id, tag) for t in tasks for tag in t.tags],
+        )
+
+    def _delete_rows(self, list_id: int, task_ids: List[int]):
+        if not task_ids:
+            return
+        params = [(list_id, t_id) for t_id in task_ids]
+        self.conn.executemany("DELETE FROM tasks WHERE list_id = ? AND id = ?", params)
+        self.conn.executemany("DELETE FROM task_tags WHERE list_id = ? AND task_id = ?", params)
+
+    def _save_state(self, list_id: int, watermark: str, marker: Any, synced_at: float):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO sync_state (list_id, watermark, marker, synced_at) VALUES (?, ?, ?, ?)",
+            (list_id, watermark, json.dumps(marker) if marker is not None else None, synced_at),
+        )
@@ -0,0 +1,67 @@
+import re
+import logging
+from typing import Any, Dict, List, Optional
+from .cache import CachedList
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+_NON_DIGITS = re.compile(r"\D")
+
+
+def timestamp_key(value: Optional[str]) -> str:
+    """
+    Sortable key for Checkvist timestamps.
+    Works for both "2026/01/01 12:00:00 +0000" and "2026-01-01T12:00:00Z" (UTC) without
+    a full datetime parse: the first 14 digits are YYYYMMDDhhmmss.
+    """
+    if not value:
+        return ""
+    return _NON_DIGITS.sub("", value)[:14]
+
+
+def compute_watermark(tasks: List[Task]) -> str:
+    return max((timestamp_key(t.updated_at) for t in tasks), default="")
+
+
+def merge_delta(entry: CachedList, rows: List[Dict[str, Any]]) -> Dict[str, List[int]]:
+    """
+    Merge a freshly downloaded task table into a cached list.
+
+    Only rows whose updated_at reached the list's high-water mark are parsed into
+    Task models and patched in; ids missing from the download are removed.
+    Rows at exactly the watermark are re-checked because timestamps have
+    one-second resolution. The cached order is then aligned with the download (new tasks
+    at their position, reordered siblings). Returns the ids that were patched and removed,
+    and the new id order under "reordered" if the order changed (else an empty list).
+    """
+    watermark = entry.watermark
+    new_watermark = watermark
+    seen = set()
+    order = []
+    merged = []
+    for row in rows:
+        task_id = row.get("id")
+        if task_id not in seen:
+            order.append(task_id)
+        seen.add(task_id)
+        key = timestamp_key(row.get("updated_at"))
+        if key > new_watermark:
+            new_watermark = key
+        if task_id in entry.tasks and key and key < watermark:
+            continue
+        task = Task(**row)
+        if entry.tasks.get(task.id) != task:
+            entry.upsert(task)
+            merged.append(task.id)
+
+    removed = [t_id for t_id in entry.tasks if t_id not in seen]
+    for t_id in removed:
+        entry.remove(t_id)
+
+    reordered = entry.reorder(order)
+
+    entry.watermark = new_watermark
+    logger.debug(f"Delta sync list {entry.list_id}: {len(merged)} merged, {len(removed)} removed, "
+                 f"reordered: {reordered}")
+    return {"merged": merged, "removed": removed, "reordered": order if reordered else []}
@@ -0,0 +1,84 @@
+from array import array
+from typing import Callable, Container, Dict, Iterable, Optional, Set
+
+# Queries shorter than one trigram cannot use the index (see TrigramIndex.find)
+MIN_QUERY = 3
+
+# Past this many candidates, intersecting another posting beats verifying them one by one
+_VERIFY_BELOW = 64
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """
+    Case-insensitive substring index over int keys: trigram -> array of the keys whose
+    text contains it. A query of three or more characters is answered by intersecting the
+    postings of its trigrams (smallest first) and verifying the survivors with `in`;
+    shorter queries are left to the caller (a word index, or a scan of a few names).
+
+    Texts are not stored: find() reads candidates back through a `fields(key)` callable,
+    which returns None for keys that are no longer live. A key may hold several fields
+    (e.g. content and tags), matched separately so that no match spans two fields.
+    Postings are append-only: a changed text is added under a new key, and stale keys
+    stay in the arrays until compact() drops them.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, array] = {}
+
+    def add(self, key: int, fields: Iterable[str]):
+        grams: Set[str] = set()
+        for field in fields:
+            if field:
+                grams |= trigrams(field.lower())
+        postings = self.postings
+        for gram in grams:
+            try:
+                postings[gram].append(key)
+            except KeyError:
+                postings[gram] = array("q", (key,))
+
+    def find(self, query: str, fields: Callable[[int], Optional[Iterable[str]]],
+             skip: Container[int] = ()) -> Set[int]:
+        """
+        Live keys with a field containing `query`; always empty below MIN_QUERY characters.
+        Keys in `skip` (e.g. already matched another way) are left out without verification.
+        """
+        q = query.lower()
+        if len(q) < MIN_QUERY:
+            return set()
+        postings = []
+        for gram in trigrams(q):
+            keys = self.postings.get(gram)
+            if not keys:
+                return set()
+            postings.append(keys)
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for keys in postings[1:]:
+            if len(candidates) <= _VERIFY_BELOW:
+                break
+            candidates.intersection_update(keys)
+        found = set()
+        for key in candidates:
+            if key in skip:
+                continue
+            texts = fields(key)
+            if texts is not None and any(q in text.lower() for text in texts):
+                found.add(key)
+        return found
+
+    def compact(self, live: Container[int]):
+        """Drop every key not in `live` from the postings."""
+        for gram in list(self.postings):
+            keys = array("q", (key for key in self.postings[gram] if key in live))
+            if keys:
+                self.postings[gram] = keys
+            else:
+                del self.postings[gram]
+
+    def nbytes(self) -> int:
+        return sum(keys.itemsize * len(keys) for keys in self.postings.values())
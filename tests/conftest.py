@@ -33,6 +33,9 @@ class StatefulMockClient:
         from src.models import Task
         return [Task(**t) for t in self.tasks if t["list_id"] == int(list_id)]
 
+    async def get_tasks_raw(self, list_id):
+        return [dict(t) for t in self.tasks if t["list_id"] == int(list_id)]
+
     async def import_tasks(self, list_id, content, parent_id=None, position=None):
         from src.models import Task
         # Simplified: treats each line as a separate task
@@ -116,9 +116,25 @@ async def test_close_task_success():
             return_value=Response(200, json={"id": 12, "status": 1, "content": "Task 12"})
         )
         
-        task = await client.close_task(1, 12)
+        tasks = await client.close_task(1, 12)
         
-        assert task.status == 1
+        assert [t.status for t in tasks] == [1]
+
+
+@pytest.mark.asyncio
+async def test_close_task_keeps_subtasks_closed_with_it():
+    client = CheckvistClient(username="test@example.com", api_key="fake_api_key")
+    client.token = "mock_token_123"
+
+    with respx.mock:
+        respx.post("https://checkvist.com/checklists/1/tasks/12/close.json").mock(
+            return_value=Response(200, json=[{"id": 12, "status": 1, "content": "Parent"},
+                                             {"id": 13, "status": 1, "content": "Child", "parent_id": 12}])
+        )
+
+        tasks = await client.close_task(1, 12)
+
+        assert [(t.id, t.status) for t in tasks] == [(12, 1), (13, 1)]
 
 @pytest.mark.asyncio
 async def test_search_tasks_success():
@@ -0,0 +1,32 @@
+from src.diff import snapshot, diff_snapshots, count_changes
+from src.models import Task
+
+
+def test_diff_snapshots_buckets():
+    old = snapshot([
+        Task(id=1, content="Keep"),
+        Task(id=2, content="Move me", parent_id=1),
+        Task(id=3, content="Rename me", tags=["a"]),
+        Task(id=4, content="Close me"),
+        Task(id=5, content="Reopen me", status=1),
+        Task(id=6, content="Remove me"),
+    ])
+    new = snapshot([
+        Task(id=1, content="Keep"),
+        Task(id=2, content="Move me", parent_id=0),
+        Task(id=3, content="Renamed", tags=["a", "b"]),
+        Task(id=4, content="Close me", status=1),
+        Task(id=5, content="Reopen me", status=0),
+        Task(id=7, content="New", parent_id=1),
+    ])
+
+    changes = diff_snapshots(old, new)
+    assert changes["added"] == [{"id": 7, "content": "New", "parent_id": 1}]
+    assert changes["removed"] == [{"id": 6, "content": "Remove me"}]
+    assert changes["moved"] == [{"id": 2, "content": "Move me", "from": 1, "to": None}]
+    assert changes["edited"] == [{"id": 3, "content": "Renamed",
+                                  "fields": {"content": ["Rename me", "Renamed"], "tags": [["a"], ["a", "b"]]}}]
+    assert changes["closed"] == [{"id": 4, "content": "Close me"}]
+    assert changes["reopened"] == [{"id": 5, "content": "Reopen me"}]
+    assert count_changes(changes) == 6
+    assert count_changes(diff_snapshots(new, new)) == 0
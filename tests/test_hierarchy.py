@@ -0,0 +1,118 @@
+from src.hierarchy import TreeIndex
+from src.models import Task
+
+
+def make_index(rows):
+    return TreeIndex([Task(id=t_id, content=str(t_id), parent_id=pid) for t_id, pid in rows])
+
+
+def test_tree_index_numbering_and_sizes():
+    index = make_index([(1, None), (2, 1), (3, 2), (4, 1), (5, 0)])
+
+    assert index.roots == [1, 5]
+    assert index.children[1] == [2, 4]
+    assert index.preorder == [1, 2, 3, 4, 5]
+    assert index.postorder == [3, 2, 4, 1, 5]
+    assert index.depth[3] == 2
+    assert index.size[1] == 4 and index.size[5] == 1
+    assert index.orphans == set()
+
+
+def test_tree_index_orphans_and_cycles():
+    index = make_index([(1, None), (2, 99), (3, 2), (4, 5), (5, 4)])
+
+    assert index.orphan_roots == [2]
+    assert index.orphans == {2, 3, 4, 5}
+    assert index.depth[3] == 1  # depth restarts under an orphan root
+    assert 4 not in index.pre  # cycle members are not numbered
+    assert index.tops() == [1, 2]
+    assert list(index.walk([4])) == [(4, 0), (5, 1)]  # cycles terminate
+
+
+def test_tree_index_walk_depth_and_prune():
+    index = make_index([(1, None), (2, 1), (3, 2), (4, 1), (5, 4)])
+
+    assert list(index.walk([1], max_depth=1)) == [(1, 0), (2, 1), (4, 1)]
+    assert [t for t, _ in index.walk([1], prune=lambda t: t == 4)] == [1, 2, 3]
+
+
+def test_subtree_is_an_interval_of_the_preorder():
+    index = make_index([(1, None), (2, 1), (3, 2), (4, 1), (5, None), (6, 7), (7, 6)])
+
+    assert index.subtree(1) == [1, 2, 3, 4]
+    assert index.descendants(2) == [3]
+    assert index.subtree(5) == [5]
+    assert index.subtree(6) == [6, 7]  # cycle: no interval, still terminates
+    assert index.subtree(42) == []
+
+
+def test_deep_chain_has_no_recursion_limit():
+    depth = 20_000
+    index = make_index([(1, None)] + [(i, i - 1) for i in range(2, depth + 1)])
+
+    assert index.depth[depth] == depth - 1
+    assert len(index.descendants(1)) == depth - 1
+    assert index.subtree(depth - 1) == [depth - 1, depth]
+
+
+def test_breadcrumb_index_shares_prefixes_and_stops_at_missing_parents():
+    from src.hierarchy import BreadcrumbIndex
+    tasks = {t.id: t for t in [
+        Task(id=1, content="Root"),
+        Task(id=2, content="Mid", parent_id=1),
+        Task(id=3, content="Leaf", parent_id=2),
+        Task(id=4, content="Orphan", parent_id=99),
+        Task(id=5, content="A", parent_id=6),
+        Task(id=6, content="B", parent_id=5),
+    ]}
+    crumbs = BreadcrumbIndex(tasks)
+
+    assert crumbs.path(3) == "Root > Mid > Leaf"
+    assert crumbs._paths[2] == "Root > Mid"  # ancestors memoized on the way
+    assert crumbs.path(4) == "Orphan"
+    assert crumbs.path(5) == "B > A"  # parent cycles terminate
+    assert crumbs.path(42) == ""
+
+
+def test_breadcrumb_index_is_linear_on_deep_chains():
+    from src.hierarchy import BreadcrumbIndex
+    depth = 5_000
+    tasks = {i: Task(id=i, content="x", parent_id=i - 1 if i > 1 else None) for i in range(1, depth + 1)}
+    crumbs = BreadcrumbIndex(tasks)
+
+    assert crumbs.path(depth).count(">") == depth - 1
+    assert crumbs.path(depth - 1).count(">") == depth - 2
+
+
+def test_page_skips_hidden_and_too_deep_subtrees():
+    index = make_index([(1, None), (2, 1), (3, 2), (4, 1), (5, None), (6, 5), (7, None), (8, 99)])
+
+    assert index.page(0, 3) == ([1, 2, 3], 3)
+    assert index.page(3, 10) == ([4, 5, 6, 7], None)  # orphan subtrees are not paged
+    assert index.page(0, 10, max_depth=0) == ([1, 5, 7], None)
+    assert index.page(0, 2, hidden=lambda t_id: t_id == 2) == ([1, 4], 4)
+
+
+def test_page_under_a_root_stays_inside_its_interval():
+    index = make_index([(1, None), (2, 1), (3, 2), (4, 3), (5, 2), (6, 1), (7, None)])
+
+    assert index.page(0, 10, root=2) == ([2, 3, 4, 5], None)
+    assert index.page(0, 10, max_depth=1, root=2) == ([2, 3, 5], None)
+    assert index.page(0, 2, root=2) == ([2, 3], 3)
+    assert index.level(4, root=2) == 2
+
+
+def test_expand_fills_budget_breadth_first_by_rank():
+    index = make_index([(1, None), (2, 1), (3, 1), (4, 2), (5, 3), (6, 5), (7, None)])
+
+    def cost(t_id, level, folded):
+        return 10 + (5 if folded else 0)
+
+    # Both roots fit (15 + 10); opening 1 swaps its marker for two folded children
+    assert index.expand([1, 7], 25, cost) == ([1, 7], set(), 25)
+    shown, expanded, used = index.expand([1, 7], 50, cost)
+    assert shown == [1, 7] and expanded == {1} and used == 50
+    # With room for one more level, the better-ranked child is opened first
+    shown, expanded, used = index.expand([1, 7], 60, cost, rank=lambda t_id: -t_id)
+    assert expanded == {1, 3} and used == 60
+    assert index.expand([1, 7], 12, cost) == ([], set(), 0)
@@ -0,0 +1,81 @@
+from src.cache import CachedList
+from src.hierarchy import TreeIndex
+from src.merkle import MerkleIndex
+from src.models import Task
+
+
+def make_entry():
+    return CachedList(100, [
+        Task(id=1, content="Root"),
+        Task(id=2, content="A", parent_id=1),
+        Task(id=3, content="A1", parent_id=2),
+        Task(id=4, content="B", parent_id=1),
+        Task(id=5, content="Other"),
+    ], fetched_at=0)
+
+
+def merkle(entry):
+    tree = entry.derived("tree", lambda e: TreeIndex(e.tasks.values()))
+    return entry.incremental("merkle", lambda e: MerkleIndex(tree, e.tasks),
+                             lambda index, changed: index.update(tree, entry.tasks, changed))
+
+
+def test_content_patch_rehashes_only_the_ancestor_path():
+    entry = make_entry()
+    index = merkle(entry)
+    before = index.copy()
+
+    entry.upsert(Task(id=3, content="A1 edited", parent_id=2))
+    assert merkle(entry) is index  # updated in place, not rebuilt
+    assert {t_id for t_id in index.subtree if index.subtree[t_id] != before.subtree[t_id]} == {1, 2, 3}
+    assert index.root != before.root
+    assert index.changed(before) == [3]
+
+    fresh = MerkleIndex(TreeIndex(entry.tasks.values()), entry.tasks)
+    assert fresh.subtree == index.subtree and fresh.root == index.root
+
+
+def test_structural_patches_match_a_full_rebuild():
+    entry = make_entry()
+    index = merkle(entry)
+    before = index.copy()
+
+    entry.upsert(Task(id=4, content="B", parent_id=5))
+    entry.remove(3)
+    entry.upsert(Task(id=6, content="New", parent_id=2))
+    index = merkle(entry)
+
+    fresh = MerkleIndex(TreeIndex(entry.tasks.values()), entry.tasks)
+    assert fresh.subtree == index.subtree and fresh.root == index.root
+    assert sorted(index.changed(before)) == [4, 6]
+    assert index.changed(index.copy()) == []
+
+
+def test_changed_since_falls_back_once_the_log_is_trimmed():
+    entry = make_entry()
+    assert entry.changed_since(0) == set()
+    entry.upsert(Task(id=2, content="A2", parent_id=1))
+    assert entry.changed_since(0) == {2}
+    assert entry.changed_since(entry.version) == set()
+
+    for i in range(100):
+        entry.upsert(Task(id=5, content=f"Other {i}"))
+    assert entry.changed_since(0) is None
+
+
+def test_flat_list_patch_rehashes_one_chunk():
+    entry = CachedList(100, [Task(id=i, content=f"Task {i}") for i in range(1, 301)]
+                       + [Task(id=1000, content="Loop", parent_id=1001), Task(id=1001, content="Loop", parent_id=1000)],
+                       fetched_at=0)
+    index = merkle(entry)
+    before = index.copy()
+    assert index.tree.cycles == [1000, 1001]
+
+    entry.upsert(Task(id=200, content="Edited"))
+    entry.upsert(Task(id=1001, content="Loop edited", parent_id=1000))
+    assert merkle(entry) is index
+    assert [i for i, chunk in enumerate(index.chunks) if chunk != before.chunks[i]] == [199 // 64]
+    assert sorted(index.changed(before)) == [200, 1001]
+
+    fresh = MerkleIndex(TreeIndex(entry.tasks.values()), entry.tasks)
+    assert fresh.chunks == index.chunks and fresh.root == index.root
@@ -33,3 +33,8 @@ def test_comment_model():
     c = Comment(id=1, comment="Hello")
     assert c.id == 1
     assert c.user_name is None
+
+def test_checklist_change_marker():
+    assert Checklist(id=1, name="No stats").change_marker() is None
+    cl = Checklist(id=1, name="Stats", updated_at="2026/01/01 10:00:00 +0000", task_count=3, task_completed=1)
+    assert cl.change_marker() == ("2026/01/01 10:00:00 +0000", 3, 1)
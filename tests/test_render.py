@@ -0,0 +1,53 @@
+from src.models import Task
+from src.render import flatten, render_tree, task_line, join_lines, wrap_chunks, iter_flat_lines, iter_due_lines
+from src.server import wrap_data
+
+
+def node(task_id, children=(), **fields):
+    return {"data": {"id": task_id, "content": f"T{task_id}", **fields}, "children": list(children)}
+
+
+def test_task_line_markers():
+    task = {"id": 7, "content": "Ship", "status": 1, "priority": 2, "due_date": "2026-01-01",
+            "tags": ["work", "deleted"]}
+
+    assert task_line(task, 1) == "  - [x] Ship !2 ^2026-01-01 #work (ID: 7)"
+    assert task_line(task, 0, status=False, meta=False) == "- Ship (ID: 7)"
+
+
+def test_render_tree_preorder_and_level_bound():
+    tree = [node(1, [node(2, [node(3)]), node(4)]), node(5)]
+
+    assert render_tree(tree) == "\n".join([
+        "- [ ] T1 (ID: 1)",
+        "  - [ ] T2 (ID: 2)",
+        "    - [ ] T3 (ID: 3)",
+        "  - [ ] T4 (ID: 4)",
+        "- [ ] T5 (ID: 5)",
+    ])
+    assert [t["id"] for t, _ in flatten(tree, max_level=1)] == [1, 2, 4, 5]
+
+
+def test_render_tree_handles_deep_and_wide_outlines():
+    deep = node(0)
+    current = deep
+    for i in range(1, 10_000):
+        child = node(i)
+        current["children"].append(child)
+        current = child
+    wide = node(0, [node(i) for i in range(1, 50_000)])
+
+    assert render_tree([deep]).count("\n") == 9_999
+    assert render_tree([wide]).count("\n") == 49_999
+
+
+def test_chunk_pipeline_matches_eager_rendering():
+    lines = ["a", "b", "c"]
+    assert "".join(join_lines(lines)) == "\n".join(lines)
+    assert "".join(join_lines([])) == ""
+    assert "".join(wrap_chunks(join_lines(lines))) == wrap_data("\n".join(lines))
+
+    tasks = [Task(id=1, content="A", status=1), Task(id=2, content="B", due_date="2026/03/01", checklist_id=7)]
+    assert list(iter_flat_lines(tasks, lambda t_id: f"P{t_id}")) == ["- [x] P1 (ID: 1)", "- [ ] P2 (ID: 2)"]
+    assert list(iter_due_lines(tasks[1:], lambda l_id: f"L{l_id}")) == [
+        "# Upcoming Due Tasks", "\n## 2026/03/01", "- B [L7] (ID: 2)"]
@@ -0,0 +1,83 @@
+from src.cache import CachedList
+from src.models import Task
+from src.search_index import TaskSearchIndex
+
+
+def make_entry(list_id, *tasks):
+    return CachedList(list_id, tasks, fetched_at=0)
+
+
+def index_entries(index, *entries):
+    for entry in entries:
+        index.refresh(entry)
+    return {entry.list_id: entry for entry in entries}
+
+
+def test_prefix_words_across_lists():
+    index = TaskSearchIndex()
+    entries = index_entries(
+        index,
+        make_entry(1, Task(id=10, content="Quarterly report Q3"), Task(id=11, content="Report bug", tags=["backend"])),
+        make_entry(2, Task(id=20, content="Onboarding checklist")),
+    )
+
+    assert index.search("report", entries) == {(1, 10), (1, 11)}
+    assert index.search("q3 rep", entries) == {(1, 10)}
+    assert index.search("back", entries) == {(1, 11)}  # tags are indexed
+    assert index.search("onboard", entries) == {(2, 20)}
+    assert index.search_words("board") == set()  # mid-word fragments are not words...
+    assert index.search("board", entries) == {(2, 20)}  # ...but the trigram index finds them
+    assert index.search("rt bu", entries) == {(1, 11)}  # substrings across words
+    assert index.search("re", entries) == {(1, 10), (1, 11)}  # short queries: word prefixes only
+    assert index.search("  ", entries) is None
+    assert index.search("report", {2: entries[2]}) == set()  # only the lists asked for
+
+
+def test_patches_are_applied_from_the_entry_log():
+    entry = make_entry(1, Task(id=10, content="Draft plan"), Task(id=11, content="Review plan"))
+    index = TaskSearchIndex()
+    entries = index_entries(index, entry)
+
+    entry.upsert(Task(id=10, content="Final plan"))
+    entry.remove(11)
+    entry.upsert(Task(id=12, content="Draft budget"))
+    assert index.can_refresh(entry)
+    index.refresh(entry)
+    assert index.search("plan", entries) == {(1, 10)}
+    assert index.search("draft", entries) == {(1, 12)}
+    assert index.search("eview", entries) == set()
+    assert len(index) == 2
+
+    index.remove_list(1)
+    assert len(index) == 0 and 1 not in index
+
+
+def test_dead_numbers_are_compacted_away():
+    entry = make_entry(1, *(Task(id=i, content=f"Task {i}") for i in range(5000)))
+    index = TaskSearchIndex()
+    index_entries(index, entry)
+    entry.upsert(Task(id=0, content="Edited"))
+    index.refresh(entry)
+    assert sum(map(len, index.postings.values())) == 2 * 5000 + 1  # the old "Task 0" number is dead
+
+    # Dropping the list leaves 5000 dead numbers, more than the live ones: purged at once
+    index.remove_list(1)
+    assert index.postings == {} and index.substrings.postings == {}
+    entries = index_entries(index, entry)
+    assert index.search("edited", entries) == {(1, 0)}
+    assert sum(map(len, index.postings.values())) == 2 * 5000 - 1
+
+
+def test_background_build_is_abandoned_when_the_list_is_removed():
+    entry = make_entry(1, *(Task(id=i, content=f"Task {i}") for i in range(1200)))
+    index = TaskSearchIndex()
+    build = index.build(entry, batch=500)
+    next(build)
+    assert 1 not in index
+    index.remove_list(1)
+    assert list(build) == []
+    assert 1 not in index and len(index) == 0
+
+    for _ in index.build(entry, batch=500):
+        pass
+    assert 1 in index and len(index) == 1200
@@ -66,6 +66,60 @@ async def test_get_list_content_resource():
         assert "Task 1" in result
 
 
+@pytest.mark.asyncio
+async def test_cache_stats_resource():
+    mock_client = AsyncMock(spec=CheckvistClient)
+    mock_client.token = "mock_token"
+    mock_client.get_tasks.return_value = [Task(id=10, content="Task 1")]
+
+    with patch("src.server.get_client", return_value=mock_client):
+        from src.server import get_list_content, cache_stats_resource
+        await get_list_content("1")
+        await get_list_content("1")
+        stats = json.loads(await cache_stats_resource())
+
+    content = stats["list_content"]
+    assert content["hits"] == 1 and content["misses"] == 1
+    assert content["lists"][0]["list_id"] == 1
+    assert content["lists"][0]["tasks"] == 1
+    assert content["lists"][0]["bytes"] > 0
+    assert stats["sync"]["full_syncs"] == 1
+    assert stats["pending_refreshes"] == []
+
+
+@pytest.mark.asyncio
+async def test_list_content_page_resource_links_next_page():
+    mock_client = AsyncMock(spec=CheckvistClient)
+    mock_client.token = "mock_token"
+    mock_client.get_tasks.return_value = [Task(id=i, content=f"Task {i}") for i in range(1, 151)]
+
+    with patch("src.server.get_client", return_value=mock_client):
+        from src.server import get_list_content_page
+        first = await get_list_content_page("1", "start")
+        assert "Task 100 (ID: 100)" in first and "Task 101" not in first
+        assert "Next page: checkvist://list/1/page/101:100" in first
+        second = await get_list_content_page("1", "101:100")
+        assert "Task 150" in second and "Next page" not in second
+
+
+@pytest.mark.asyncio
+async def test_due_resource_groups_by_date_in_one_envelope():
+    mock_client = AsyncMock(spec=CheckvistClient)
+    mock_client.token = "mock_token"
+    mock_client.get_checklists.return_value = [Checklist(id=1, name="Work")]
+    mock_client.get_due_tasks.return_value = [
+        Task(id=2, content="Later", checklist_id=1, due_date="2026/03/02"),
+        Task(id=1, content="Sooner", checklist_id=1, due_date="2026/03/01"),
+    ]
+
+    with patch("src.server.get_client", return_value=mock_client):
+        from src.server import due_resource
+        result = await due_resource()
+
+    assert result.count("<user_data>") == 1
+    assert result.index("## 2026/03/01") < result.index("- Sooner [Work] (ID: 1)") < result.index("## 2026/03/02")
+
+
 @pytest.mark.asyncio
 async def test_get_tree_filters_deleted(stateful_client):
     """Verify get_tree filters logically deleted tasks."""
@@ -75,6 +129,68 @@ async def test_get_tree_filters_deleted(stateful_client):
     data = json.loads(result)
     assert "Setup API" not in data["data"]
 
+
+@pytest.mark.asyncio
+async def test_get_tree_paginates_with_cursor(stateful_client):
+    from src.server import add_task, get_tree
+    await add_task("100", "Second root")
+    data = json.loads(await get_tree("100", depth=3, page_size=1))
+    assert data["data"]["tree"].count("(ID: ") == 1
+    cursor = data["data"]["next_cursor"]
+    assert cursor
+
+    data = json.loads(await get_tree("100", depth=3, cursor=cursor, page_size=100))
+    assert data["data"]["next_cursor"] is None
+    assert f"(ID: {cursor.split(':')[0]})" in data["data"]["tree"]
+
+    data = json.loads(await get_tree("100", cursor="nope"))
+    assert data["success"] is False
+
+
+@pytest.mark.asyncio
+async def test_get_tree_from_root_task(stateful_client):
+    from src.server import add_task, get_tree
+    await add_task("100", "Child", parent_id="2")
+    await add_task("100", "Unrelated")
+
+    data = json.loads(await get_tree("100", depth=2, root_task_id="2"))
+    assert data["success"] is True
+    assert "Setup API" in data["data"] and "Child" in data["data"]
+    assert "Unrelated" not in data["data"]
+
+
+@pytest.mark.asyncio
+async def test_get_tree_with_token_budget_marks_folded_tasks(stateful_client):
+    from src.server import add_task, get_tree
+    for i in range(3):
+        await add_task("100", f"Child {i}", parent_id="2")
+
+    data = json.loads(await get_tree("100", budget=15))
+    assert data["success"] is True
+    assert "[F: 3]" in data["data"] and "Child 0" not in data["data"]
+
+    data = json.loads(await get_tree("100", budget=500))
+    assert "[F:" not in data["data"] and "Child 2" in data["data"]
+
+
+@pytest.mark.asyncio
+async def test_get_changes_returns_compact_deltas(stateful_client):
+    from src.server import add_task, close_task, get_changes
+    data = json.loads(await get_changes("100"))
+    assert data["success"] is True and data["data"]["changes"] is None
+    since = data["data"]["since"]
+
+    await add_task("100", "Fresh idea")
+    await close_task("100", "2")
+    data = json.loads(await get_changes("100", since=since))
+    changes = data["data"]["changes"]
+    assert "Fresh idea" in changes["added"][0]["content"]
+    assert "<user_data>" in changes["added"][0]["content"]
+    assert [t["id"] for t in changes["closed"]] == [2]
+
+    data = json.loads(await get_changes("100", since="bogus"))
+    assert data["success"] is False
+
 @pytest.mark.asyncio
 async def test_review_data_wrapping(stateful_client):
     """Verify get_review_data uses XML wrapping."""
@@ -0,0 +1,895 @@
+import pytest
+from unittest.mock import AsyncMock
+from src.service import CheckvistService
+from src.cache import ListContentCache
+from src.models import Task
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_client(tasks_by_list):
+    client = AsyncMock()
+    client.token = "token"
+    client.get_tasks.side_effect = lambda l_id: [Task(**t) for t in tasks_by_list.get(l_id, [])]
+    client.get_tasks_raw.side_effect = lambda l_id: [dict(t) for t in tasks_by_list.get(l_id, [])]
+    return client
+
+
+# --- LIST CONTENT CACHE ---
+
+@pytest.mark.asyncio
+async def test_get_tasks_read_through_counts_hits_and_misses():
+    client = make_client({100: [{"id": 1, "content": "A"}]})
+    service = CheckvistService(client)
+
+    first = await service.get_tasks(100)
+    second = await service.get_tasks(100)
+
+    assert [t.id for t in first] == [t.id for t in second] == [1]
+    assert client.get_tasks.await_count == 1
+    stats = service.get_cache_stats()["list_content"]
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_get_tasks_refetches_after_ttl():
+    client = make_client({100: [{"id": 1, "content": "A"}]})
+    service = CheckvistService(client, content_cache_ttl=30, stale_grace=0)
+    timer = FakeTimer()
+    service.list_content_cache.timer = timer
+
+    await service.get_tasks(100)
+    timer.now += 31
+    await service.get_tasks(100)
+
+    assert client.get_tasks.await_count + client.get_tasks_raw.await_count == 2
+
+
+def test_list_content_cache_lru_eviction_respects_pinning():
+    cache = ListContentCache(maxsize=2, ttl=30, pinned=[1])
+    for l_id in (1, 2, 3, 4):
+        cache.put(l_id, [])
+
+    assert 1 in cache  # pinned lists do not count towards maxsize
+    assert 2 not in cache
+    assert 3 in cache and 4 in cache
+    assert cache.evictions == 1
+
+
+def test_list_content_cache_packs_cold_entries_then_evicts_by_bytes():
+    big = [Task(id=i, content="x" * 500, notes="n" * 500) for i in range(50)]
+    cache = ListContentCache(maxsize=10, ttl=30, max_bytes=len(big) * 2000)
+    cache.put(1, big)
+    cache.put(2, big)
+    assert cache.peek(1).packed and not cache.peek(2).packed
+    assert cache.nbytes() <= cache.max_bytes
+
+    # Packed entries are restored transparently on access
+    assert cache.peek(1).tasks[7].notes == "n" * 500
+
+    cache.max_bytes = 1
+    cache.put(3, [Task(id=1, content="small")])
+    assert list(cache._entries) == [3]  # the most recent entry is kept even over budget
+    assert cache.stats()["evictions"] == 2
+
+
+def test_list_content_cache_byte_estimate_follows_patches_without_rescans():
+    from src.cache import CachedList
+    cache = ListContentCache(maxsize=10, ttl=30, max_bytes=10 ** 6)
+    entry = cache.put(1, [Task(id=i, content="x" * 10, tags=["a"]) for i in range(100)])
+    entry.upsert(Task(id=5, content="y" * 400, notes="n" * 50))
+    entry.upsert(Task(id=200, content="new"))
+    entry.remove(7)
+    entry.add_comment(8, {"comment": "c" * 30})
+    assert entry.nbytes() == CachedList(1, entry.task_list(), fetched_at=0).nbytes()
+
+    sized = []
+    entry.nbytes = lambda: sized.append(1) or 0
+    for _ in range(5):
+        cache.get(1)
+    assert sized == []  # hits do not re-check the byte budget
+
+
+def test_list_content_cache_lfu_keeps_frequently_used_lists():
+    cache = ListContentCache(maxsize=2, ttl=30, policy="lfu")
+    cache.put(1, [])
+    for _ in range(3):
+        cache.get(1)
+    cache.put(2, [])
+    cache.put(3, [])
+    assert 1 in cache and 2 not in cache and 3 in cache
+
+
+@pytest.mark.asyncio
+async def test_ambiguous_mutations_invalidate_cached_list():
+    client = make_client({100: [{"id": 1, "content": "A"}]})
+    client.import_tasks.return_value = {"status": "ok"}
+    client.bulk_tag_tasks.return_value = {"status": "ok"}
+    service = CheckvistService(client)
+
+    for mutate in (
+        lambda: service.import_tasks(100, "C"),
+        lambda: service.move_task_hierarchical(100, 1, 200),
+        lambda: service.bulk_tag_tasks(100, [1], "x"),
+    ):
+        await service.get_tasks(100)
+        assert 100 in service.list_content_cache
+        await mutate()
+        assert 100 not in service.list_content_cache
+
+
+# --- WRITE-THROUGH PATCHING ---
+
+@pytest.mark.asyncio
+async def test_mutations_patch_cached_list_without_refetch():
+    client = make_client({100: [
+        {"id": 1, "content": "Parent", "notes": "keep me"},
+        {"id": 2, "content": "Child", "parent_id": 1},
+    ]})
+    client.update_task.return_value = Task(id=1, content="Renamed")
+    client.close_task.return_value = Task(id=2, content="Child", parent_id=1, status=1)
+    client.add_task.return_value = Task(id=3, content="New", parent_id=1)
+    client.move_task.return_value = Task(id=2, content="Child", parent_id=None)
+    service = CheckvistService(client)
+    await service.get_tasks(100)
+
+    await service.update_task(100, 1, content="Renamed")
+    await service.close_task(100, 2)
+    await service.add_task(100, "New", parent_id=1)
+    await service.move_task(100, 2, None)
+    tasks = {t.id: t for t in await service.get_tasks(100)}
+
+    assert client.get_tasks.await_count == 1
+    assert tasks[1].content == "Renamed"
+    assert tasks[1].notes == "keep me"  # not part of the mutation response
+    assert tasks[2].status == 1 and tasks[2].parent_id is None
+    assert tasks[3].parent_id == 1
+
+
+@pytest.mark.asyncio
+async def test_closing_a_parent_patches_the_subtasks_closed_with_it():
+    client = make_client({100: [
+        {"id": 1, "content": "Parent"},
+        {"id": 2, "content": "Child", "parent_id": 1},
+    ]})
+    client.close_task.return_value = [Task(id=1, content="Parent", status=1),
+                                      Task(id=2, content="Child", parent_id=1, status=1)]
+    client.reopen_task.return_value = [Task(id=1, content="Parent", status=0),
+                                       Task(id=2, content="Child", parent_id=1, status=0)]
+    service = CheckvistService(client)
+    await service.get_tasks(100)
+
+    closed = await service.close_task(100, 1)
+    assert closed.id == 1
+    assert [t.status for t in await service.get_tasks(100)] == [1, 1]
+
+    reopened = await service.reopen_task(100, 1)
+    assert reopened.id == 1
+    assert [t.status for t in await service.get_tasks(100)] == [0, 0]
+    assert client.get_tasks.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_derived_index_rebuilt_only_on_structural_patch():
+    client = make_client({100: [{"id": 1, "content": "A"}, {"id": 2, "content": "B", "parent_id": 1}]})
+    service = CheckvistService(client)
+    entry = await service._get_list_entry(100)
+    builds = []
+    build = lambda e: builds.append(1) or len(e)
+
+    entry.derived("size", build)
+    entry.upsert(Task(id=2, content="B2", parent_id=1))
+    entry.derived("size", build)
+    entry.upsert(Task(id=2, content="B2", parent_id=None))
+    entry.derived("size", build)
+
+    assert len(builds) == 2
+
+
+# --- DELTA SYNC ---
+
+@pytest.mark.asyncio
+async def test_delta_sync_merges_only_changed_rows_and_detects_deletions():
+    rows = {100: [
+        {"id": 1, "content": "Old", "updated_at": "2026/01/01 10:00:00 +0000"},
+        {"id": 2, "content": "Gone", "updated_at": "2026/01/01 10:00:00 +0000"},
+        {"id": 3, "content": "Edited", "updated_at": "2026/01/02 10:00:00 +0000"},
+    ]}
+    client = make_client(rows)
+    service = CheckvistService(client, content_cache_ttl=30, stale_grace=0)
+    timer = FakeTimer()
+    service.list_content_cache.timer = timer
+    before = {t.id: t for t in await service.get_tasks(100)}
+
+    rows[100] = [
+        {"id": 1, "content": "Old", "updated_at": "2026/01/01 10:00:00 +0000"},
+        {"id": 3, "content": "Edited twice", "updated_at": "2026-01-03T09:00:00Z"},
+        {"id": 4, "content": "Added", "parent_id": 1, "updated_at": "2026-01-03T09:00:00Z"},
+    ]
+    timer.now += 31
+    after = {t.id: t for t in await service.get_tasks(100)}
+
+    assert client.get_tasks.await_count == 1
+    assert after[1] is before[1]  # unchanged row not re-parsed
+    assert after[3].content == "Edited twice"
+    assert 2 not in after and 4 in after
+    sync = service.get_cache_stats()["sync"]
+    assert sync["delta_syncs"] == 1
+    assert sync["tasks_merged"] == 2
+    assert sync["tasks_removed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_delta_sync_follows_the_downloaded_order():
+    rows = {100: [
+        {"id": 1, "content": "first", "updated_at": "2026/01/01 10:00:00 +0000"},
+        {"id": 2, "content": "second", "updated_at": "2026/01/01 10:00:00 +0000"},
+    ]}
+    client = make_client(rows)
+    service = CheckvistService(client, content_cache_ttl=30, stale_grace=0)
+    timer = FakeTimer()
+    service.list_content_cache.timer = timer
+    assert [n["data"]["id"] for n in await service.get_tree(100)] == [1, 2]
+
+    rows[100] = [{"id": 3, "content": "new top", "updated_at": "2026/01/02 10:00:00 +0000"},
+                 rows[100][1], rows[100][0]]
+    timer.now += 31
+    assert [n["data"]["id"] for n in await service.get_tree(100)] == [3, 2, 1]
+    assert client.get_tasks.await_count == 1
+    assert [t.id for t, _ in (await service.get_tasks_page(100))["items"]] == [3, 2, 1]
+
+
+@pytest.mark.asyncio
+async def test_full_resync_after_interval():
+    client = make_client({100: [{"id": 1, "content": "A"}]})
+    service = CheckvistService(client, content_cache_ttl=30, full_resync_interval=600)
+    timer = FakeTimer()
+    service.list_content_cache.timer = timer
+
+    await service.get_tasks(100)
+    timer.now += 601
+    await service.get_tasks(100)
+
+    assert client.get_tasks.await_count == 2
+    assert client.get_tasks_raw.await_count == 0
+
+
+# --- CHECKLIST-LEVEL CHANGE DETECTION ---
+
+@pytest.mark.asyncio
+async def test_unchanged_checklist_marker_skips_refetch():
+    from cachetools import TTLCache
+    from src.models import Checklist
+    client = make_client({100: [{"id": 1, "content": "A"}]})
+    lists = [{"id": 100, "name": "Work", "updated_at": "2026/01/01 10:00:00 +0000", "task_count": 1}]
+    client.get_checklists.side_effect = lambda: [Checklist(**l) for l in lists]
+    service = CheckvistService(client, content_cache_ttl=30, stale_grace=0)
+    timer = FakeTimer()
+    service.list_content_cache.timer = timer
+    service.list_cache = TTLCache(maxsize=100, ttl=15, timer=timer)
+
+    await service.get_checklists()
+    await service.get_tasks(100)
+    timer.now += 31
+    await service.get_checklists()
+    await service.get_tasks(100)
+    assert client.get_tasks.await_count == 1
+    assert client.get_tasks_raw.await_count == 0
+    assert service.get_cache_stats()["sync"]["unchanged_skips"] == 1
+
+    lists[0]["task_count"] = 2
+    timer.now += 31
+    await service.get_checklists()
+    await service.get_tasks(100)
+    assert client.get_tasks_raw.await_count == 1
+
+
+# --- STALE-WHILE-REVALIDATE ---
+
+@pytest.mark.asyncio
+async def test_stale_list_served_within_grace_and_refreshed_once():
+    rows = {100: [{"id": 1, "content": "Old"}]}
+    client = make_client(rows)
+    service = CheckvistService(client, content_cache_ttl=30, stale_grace=60)
+    timer = FakeTimer()
+    service.list_content_cache.timer = timer
+    await service.get_tasks(100)
+
+    rows[100] = [{"id": 1, "content": "New"}]
+    timer.now += 31
+    first = await service.get_tasks(100)
+    second = await service.get_tasks(100)
+    assert first[0].content == second[0].content == "Old"
+    assert service.is_possibly_stale(100)
+
+    await service.wait_for_refreshes()
+    assert not service.is_possibly_stale(100)
+    assert client.get_tasks_raw.await_count == 1  # one deduplicated background refresh
+    assert (await service.get_tasks(100))[0].content == "New"
+
+
+@pytest.mark.asyncio
+async def test_list_past_grace_window_blocks_on_refresh():
+    rows = {100: [{"id": 1, "content": "Old"}]}
+    client = make_client(rows)
+    service = CheckvistService(client, content_cache_ttl=30, stale_grace=60)
+    timer = FakeTimer()
+    service.list_content_cache.timer = timer
+    await service.get_tasks(100)
+
+    rows[100] = [{"id": 1, "content": "New"}]
+    timer.now += 91
+    assert (await service.get_tasks(100))[0].content == "New"
+    assert not service.is_possibly_stale(100)
+
+
+@pytest.mark.asyncio
+async def test_stale_checklists_served_while_refreshing():
+    from cachetools import TTLCache
+    from src.models import Checklist
+    client = make_client({})
+    names = ["Work"]
+    client.get_checklists.side_effect = lambda: [Checklist(id=100, name=n) for n in names]
+    service = CheckvistService(client, stale_grace=60)
+    timer = FakeTimer()
+    service.list_cache = TTLCache(maxsize=100, ttl=15, timer=timer)
+    await service.get_checklists()
+
+    names[0] = "Renamed"
+    timer.now += 20
+    assert (await service.get_checklists())[0].name == "Work"
+    await service.wait_for_refreshes()
+    assert (await service.get_checklists())[0].name == "Renamed"
+    assert client.get_checklists.await_count == 2
+
+
+# --- SQLITE MIRROR ---
+
+@pytest.mark.asyncio
+async def test_mirror_warm_start_serves_fresh_list_without_upstream_call(tmp_path):
+    db = str(tmp_path / "cache.db")
+    first = CheckvistService(make_client({100: [{"id": 1, "content": "A", "tags": {"work": False}}]}), mirror_path=db)
+    await first.get_tasks(100)
+    first.close()
+
+    client = make_client({})
+    service = CheckvistService(client, mirror_path=db)
+    tasks = await service.get_tasks(100)
+
+    assert [(t.id, t.tags) for t in tasks] == [(1, ["work"])]
+    assert client.get_tasks.await_count == 0
+    service.close()
+
+
+@pytest.mark.asyncio
+async def test_mirror_stale_list_is_served_then_revalidated_in_background(tmp_path):
+    db = str(tmp_path / "cache.db")
+    rows = {100: [{"id": 1, "content": "Old", "updated_at": "2026/01/01 10:00:00 +0000"}]}
+    first = CheckvistService(make_client(rows), mirror_path=db)
+    await first.get_tasks(100)
+    # Pretend the previous session synced a minute ago
+    first.mirror.conn.execute("UPDATE sync_state SET synced_at = synced_at - 60")
+    first.mirror.conn.commit()
+    first.close()
+
+    rows[100] = [{"id": 1, "content": "New", "updated_at": "2026/01/02 10:00:00 +0000"}]
+    client = make_client(rows)
+    service = CheckvistService(client, content_cache_ttl=30, mirror_path=db)
+
+    assert (await service.get_tasks(100))[0].content == "Old"
+    await service.wait_for_refreshes()
+    assert client.get_tasks_raw.await_count == 1
+    assert service.mirror.load_list(100)["tasks"][0].content == "New"
+    service.close()
+
+
+@pytest.mark.asyncio
+async def test_mutation_on_evicted_list_drops_its_mirrored_copy(tmp_path):
+    rows = {100: [{"id": 1, "content": "A"}], 200: [{"id": 2, "content": "B"}]}
+    client = make_client(rows)
+    service = CheckvistService(client, content_cache_size=1, mirror_path=str(tmp_path / "cache.db"))
+    await service.get_tasks(100)
+    await service.get_tasks(200)  # evicts 100 from memory, the mirror still has it
+
+    rows[100].append({"id": 3, "content": "New", "parent_id": None})
+    client.add_task.return_value = Task(id=3, content="New", checklist_id=100)
+    await service.add_task(100, "New")
+
+    assert [t.content for t in await service.get_tasks(100)] == ["A", "New"]
+    assert client.get_tasks.await_count == 3
+    service.close()
+
+
+@pytest.mark.asyncio
+async def test_mirror_list_past_the_grace_window_blocks_on_sync(tmp_path):
+    db = str(tmp_path / "cache.db")
+    rows = {100: [{"id": 1, "content": "Old", "updated_at": "2026/01/01 10:00:00 +0000"}]}
+    first = CheckvistService(make_client(rows), mirror_path=db)
+    await first.get_tasks(100)
+    first.mirror.conn.execute("UPDATE sync_state SET synced_at = synced_at - 3600")
+    first.mirror.conn.commit()
+    first.close()
+
+    rows[100] = [{"id": 1, "content": "New", "updated_at": "2026/01/02 10:00:00 +0000"}]
+    client = make_client(rows)
+    service = CheckvistService(client, content_cache_ttl=30, stale_grace=60, mirror_path=db)
+
+    assert (await service.get_tasks(100))[0].content == "New"
+    # Served only after a blocking sync (a full one: the copy is past full_resync_interval)
+    assert client.get_tasks.await_count == 1
+    assert service._refreshes == {}
+    service.close()
+
+
+@pytest.mark.asyncio
+async def test_mirror_warm_start_past_the_ttl_reuses_lists_whose_marker_matches(tmp_path):
+    from src.models import Checklist
+    db = str(tmp_path / "cache.db")
+    rows = {
+        100: [{"id": 1, "content": "A", "updated_at": "2026/01/01 10:00:00 +0000"}],
+        200: [{"id": 2, "content": "B", "updated_at": "2026/01/01 10:00:00 +0000"}],
+    }
+    lists = [Checklist(id=100, name="Work", updated_at="2026/01/01 10:00:00 +0000", task_count=1),
+             Checklist(id=200, name="Home", updated_at="2026/01/01 10:00:00 +0000", task_count=1)]
+    first_client = make_client(rows)
+    first_client.get_checklists.return_value = lists
+    first = CheckvistService(first_client, mirror_path=db)
+    await first.get_checklists()
+    await first.get_tasks(100)
+    await first.get_tasks(200)
+    first.mirror.conn.execute("UPDATE sync_state SET synced_at = synced_at - 600")
+    first.mirror.conn.commit()
+    first.close()
+
+    # List 200 changed while the server was down
+    rows[200] = [{"id": 2, "content": "B2", "updated_at": "2026/01/02 10:00:00 +0000"}]
+    client = make_client(rows)
+    client.get_checklists.return_value = [
+        lists[0], Checklist(id=200, name="Home", updated_at="2026/01/02 10:00:00 +0000", task_count=1)
+    ]
+    service = CheckvistService(client, content_cache_ttl=30, stale_grace=60, mirror_path=db)
+
+    assert (await service.get_tasks(100))[0].content == "A"
+    assert (await service.get_tasks(200))[0].content == "B2"
+    assert client.get_checklists.await_count == 1  # one call vouches for every mirrored list
+    assert client.get_tasks.await_count + client.get_tasks_raw.await_count == 1  # only the changed list
+    assert service.sync_stats["unchanged_skips"] == 1
+    service.close()
+
+
+def test_mirror_rebuilds_on_schema_version_change(tmp_path):
+    from src import storage
+    db = str(tmp_path / "cache.db")
+    mirror = storage.SQLiteMirror(db)
+    mirror.save_list(100, [Task(id=1, content="A")], "", None, 0.0)
+    mirror.conn.execute("UPDATE meta SET value = '0' WHERE key = 'schema_version'")
+    mirror.conn.commit()
+    mirror.close()
+
+    mirror = storage.SQLiteMirror(db)
+    assert mirror.load_list(100) is None
+    mirror.close()
+
+
+# --- NEGATIVE CACHE ---
+
+@pytest.mark.asyncio
+async def test_missing_ids_are_remembered_until_a_mutation():
+    from src.exceptions import CheckvistResourceNotFoundError
+    client = make_client({100: [{"id": 1, "content": "A"}]})
+    def get_tasks(l_id):
+        if l_id == 999:
+            raise CheckvistResourceNotFoundError("Resource not found", status_code=404)
+        return [Task(id=1, content="A")]
+    client.get_tasks.side_effect = get_tasks
+    client.get_task.side_effect = CheckvistResourceNotFoundError("Resource not found", status_code=404)
+    client.update_task.return_value = Task(id=1, content="B")
+    service = CheckvistService(client)
+
+    for _ in range(3):
+        with pytest.raises(CheckvistResourceNotFoundError):
+            await service.get_tasks(999)
+        with pytest.raises(CheckvistResourceNotFoundError):
+            await service.get_task_enriched(100, 42)
+    assert client.get_tasks.await_args_list.count(((999,),)) == 1
+    assert client.get_task.await_count == 1
+    assert service.get_cache_stats()["not_found"]["hits"] == 4
+
+    await service.update_task(100, 1, content="B")
+    with pytest.raises(CheckvistResourceNotFoundError):
+        await service.get_task_enriched(100, 42)
+    assert client.get_task.await_count == 2
+
+
+# --- CHECKLIST INDEX ---
+
+def test_checklist_index_matches_like_linear_scan():
+    from src.checklist_index import ChecklistIndex
+    from src.models import Checklist
+    lists = [Checklist(id=i, name=n) for i, n in enumerate(
+        ["Old Inbox", "Inbox", "Engineering", "Reading List", "Eng"], start=1)]
+    index = ChecklistIndex(lists)
+
+    for query in ("inbox", "ENG", "in", "list", "missing", "ng L"):
+        assert index.find(query) == [l for l in lists if query.lower() in l.name.lower()]
+    assert index.get(3).name == "Engineering"
+    assert index.best_match("inbox").id == 2  # exact name wins over earlier substring matches
+    assert index.best_match("read").id == 4
+
+
+@pytest.mark.asyncio
+async def test_checklist_index_rebuilt_only_on_refresh():
+    from src.models import Checklist
+    client = make_client({})
+    client.get_checklists.side_effect = lambda: [Checklist(id=1, name="Work")]
+    service = CheckvistService(client)
+
+    first = await service.get_checklist_index()
+    assert await service.get_checklist_index() is first
+    assert await service.get_list_name(1) == "Work"
+    assert await service.get_list_name(2) == "Unknown"
+
+    service.invalidate_checklists()
+    assert await service.get_checklist_index() is not first
+
+
+# --- GENERATIONS ---
+
+@pytest.mark.asyncio
+async def test_fetch_racing_a_mutation_is_not_cached():
+    import asyncio
+    rows = {100: [{"id": 1, "content": "Before"}]}
+    client = make_client(rows)
+    release = asyncio.Event()
+
+    async def slow_get_tasks(l_id):
+        snapshot = [Task(**t) for t in rows[l_id]]
+        await release.wait()
+        return snapshot
+
+    client.get_tasks.side_effect = slow_get_tasks
+    client.import_tasks.return_value = {"status": "ok"}
+    service = CheckvistService(client)
+
+    fetch = asyncio.create_task(service.get_tasks(100))
+    await asyncio.sleep(0)
+    rows[100] = [{"id": 1, "content": "Before"}, {"id": 2, "content": "Imported"}]
+    await service.import_tasks(100, "Imported")
+    release.set()
+
+    assert [t.id for t in await fetch] == [1]  # the caller still gets its answer
+    assert 100 not in service.list_content_cache
+    assert service.get_cache_stats()["sync"]["discarded_fetches"] == 1
+    assert [t.id for t in await service.get_tasks(100)] == [1, 2]
+
+
+# --- SHARED MEMORY-MAPPED CACHE ---
+
+@pytest.mark.asyncio
+async def test_shared_cache_serves_other_process_and_honours_mutations(tmp_path):
+    path = str(tmp_path / "shared.bin")
+    rows = {100: [{"id": 1, "content": "A", "updated_at": "2026/01/01 10:00:00 +0000"}]}
+    first_client, second_client = make_client(rows), make_client(rows)
+    first_client.update_task.return_value = Task(id=1, content="B")
+    first = CheckvistService(first_client, shared_cache_path=path, shared_cache_mb=1)
+    second = CheckvistService(second_client, shared_cache_path=path, shared_cache_mb=1)
+
+    await first.get_tasks(100)
+    assert [t.content for t in await second.get_tasks(100)] == ["A"]
+    assert second_client.get_tasks.await_count == 0
+    assert second.get_cache_stats()["sync"]["shared_hits"] == 1
+
+    # A patch tombstones the shared copy instead of republishing the whole list
+    rows[100] = [{"id": 1, "content": "B", "updated_at": "2026/01/02 10:00:00 +0000"}]
+    await first.update_task(100, 1, content="B")
+    assert first.shared.synced_at(100) is None
+    second.list_content_cache.pop(100)
+    assert [t.content for t in await second.get_tasks(100)] == ["B"]
+    assert second_client.get_tasks.await_count == 1
+    # ...and the sync that followed republished it for the other processes
+    first.list_content_cache.pop(100)
+    assert [t.content for t in await first.get_tasks(100)] == ["B"]
+    assert first_client.get_tasks.await_count == 1
+    first.close()
+    second.close()
+
+
+@pytest.mark.asyncio
+async def test_shared_cache_payload_is_not_decoded_when_local_copy_is_newer(tmp_path):
+    from unittest.mock import patch
+    path = str(tmp_path / "shared.bin")
+    rows = {100: [{"id": 1, "content": "A"}]}
+    first = CheckvistService(make_client(rows), shared_cache_path=path, shared_cache_mb=1)
+    await first.get_tasks(100)
+    second = CheckvistService(make_client(rows), content_cache_ttl=0, stale_grace=0,
+                              shared_cache_path=path, shared_cache_mb=1)
+    second.list_content_cache.put(100, [Task(id=1, content="A")])  # synced just now
+
+    with patch.object(second.shared, "get", wraps=second.shared.get) as get:
+        await second.get_tasks(100)
+    assert get.call_count == 0
+    first.close()
+    second.close()
+
+
+def test_shared_cache_rejects_older_writes_and_detects_overwritten_blobs(tmp_path):
+    from src.shared_cache import SharedListCache
+    store = SharedListCache(str(tmp_path / "shared.bin"), size_mb=1, slots=4)
+    store.put(1, [Task(id=1, content="new")], "", None, synced_at=200.0)
+    assert not store.put(1, [Task(id=1, content="old")], "", None, synced_at=100.0)
+    store.delete(1, synced_at=300.0)
+    assert store.get(1) is None
+    assert not store.put(1, [Task(id=1, content="in flight")], "", None, synced_at=250.0)
+
+    # Fill the ring with incompressible content until list 2's blob is overwritten
+    import os
+    store.put(2, [Task(id=1, content="two")], "", None, synced_at=1.0)
+    for i in range(3):
+        store.put(3, [Task(id=1, content=os.urandom(400_000).hex())], "", None, synced_at=10.0 + i)
+    assert store.get(2) is None
+    store.close()
+
+
+# --- ENRICHMENT ---
+
+@pytest.mark.asyncio
+async def test_get_task_enriched_uses_fresh_cached_list_without_requests():
+    client = make_client({100: [
+        {"id": 1, "content": "Root"},
+        {"id": 2, "content": "Leaf", "parent_id": 1, "notes": "n"},
+    ]})
+    service = CheckvistService(client)
+    await service.get_tasks(100)
+
+    result = await service.get_task_enriched(100, 2)
+
+    assert client.get_task.await_count == 0
+    assert client.get_tasks.await_count == 1
+    assert result["breadcrumb"] == "Root > Leaf"
+    assert result["notes"] == "n"
+
+
+@pytest.mark.asyncio
+async def test_get_task_enriched_fetches_task_and_list_concurrently():
+    import asyncio
+    client = make_client({})
+    started = []
+    both_started = asyncio.Event()
+
+    async def fetch(name, value):
+        started.append(name)
+        if len(started) == 2:
+            both_started.set()
+        await asyncio.wait_for(both_started.wait(), timeout=1)
+        return value
+
+    async def get_task(l_id, t_id):
+        return await fetch("task", Task(id=2, content="Leaf", notes="n"))
+
+    async def get_tasks(l_id):
+        return await fetch("list", [Task(id=2, content="Leaf")])
+
+    client.get_task.side_effect = get_task
+    client.get_tasks.side_effect = get_tasks
+    service = CheckvistService(client)
+
+    result = await service.get_task_enriched(100, 2)
+
+    assert sorted(started) == ["list", "task"]
+    assert result["notes"] == "n"
+
+
+@pytest.mark.asyncio
+async def test_archive_task_tags_the_whole_branch_of_a_deep_outline():
+    rows = [{"id": 1, "content": "Root"}] + [{"id": i, "content": f"T{i}", "parent_id": i - 1} for i in range(2, 2001)]
+    rows.append({"id": 5000, "content": "Sibling"})
+    client = make_client({100: rows})
+    client.update_task.side_effect = lambda l_id, t_id, tags: Task(id=t_id, content="x", tags=tags.split(","))
+    service = CheckvistService(client)
+
+    result = await service.archive_task(100, 1)
+
+    assert "1999 descendants" in result
+    archived = {call.args[1] for call in client.update_task.await_args_list}
+    assert archived == set(range(1, 2001))
+
+
+@pytest.mark.asyncio
+async def test_tree_and_list_pages_resume_from_cursor_after_edits():
+    rows = [{"id": 1, "content": "Root"}] + [{"id": i, "content": f"T{i}", "parent_id": 1} for i in range(2, 8)]
+    rows[3]["tags"] = {"deleted": "deleted"}  # task 4
+    client = make_client({100: rows})
+    service = CheckvistService(client)
+
+    first = await service.get_tree_page(100, depth=2, page_size=3)
+    assert [(task["id"], level) for task, level in first["items"]] == [(1, 0), (2, 1), (3, 1)]
+    assert first["next_cursor"] == "5:4"
+
+    # The cursor names the next task, so removing an earlier one does not skip anything
+    service._drop_list(100)
+    del rows[2]
+    second = await service.get_tree_page(100, depth=2, cursor=first["next_cursor"], page_size=3)
+    assert [task["id"] for task, _ in second["items"]] == [5, 6, 7]
+    assert second["next_cursor"] is None
+
+    flat = await service.get_tasks_page(100, page_size=2)
+    assert [(t.id, path) for t, path in flat["items"]] == [(1, "Root"), (2, "Root > T2")]
+    rest = await service.get_tasks_page(100, cursor=flat["next_cursor"])
+    assert [t.id for t, _ in rest["items"]] == [5, 6, 7]
+    assert rest["next_cursor"] is None
+
+    with pytest.raises(ValueError):
+        await service.get_tree_page(100, cursor="bogus")
+
+
+@pytest.mark.asyncio
+async def test_subtree_queries_start_at_the_requested_task():
+    from src.exceptions import CheckvistResourceNotFoundError
+    rows = [{"id": 1, "content": "Root"}, {"id": 2, "content": "Branch", "parent_id": 1},
+            {"id": 3, "content": "Leaf", "parent_id": 2}, {"id": 4, "content": "Deep", "parent_id": 3},
+            {"id": 5, "content": "Other", "parent_id": 1}]
+    service = CheckvistService(make_client({100: rows}))
+
+    nested = await service.get_subtree(100, 2, depth=2)
+    assert [n["data"]["id"] for n in nested] == [2]
+    assert [c["data"]["id"] for c in nested[0]["children"]] == [3]
+    assert nested[0]["children"][0]["children"] == []
+
+    page = await service.get_tree_page(100, depth=5, root_task_id=2, page_size=2)
+    assert [(task["id"], level) for task, level in page["items"]] == [(2, 0), (3, 1)]
+    rest = await service.get_tree_page(100, depth=5, root_task_id=2, cursor=page["next_cursor"])
+    assert [task["id"] for task, _ in rest["items"]] == [4]
+    assert rest["next_cursor"] is None
+
+    with pytest.raises(CheckvistResourceNotFoundError):
+        await service.get_subtree(100, 42)
+
+
+@pytest.mark.asyncio
+async def test_tree_within_budget_folds_what_does_not_fit():
+    rows = [{"id": 1, "content": "Root"},
+            {"id": 2, "content": "Low", "parent_id": 1},
+            {"id": 3, "content": "Urgent", "parent_id": 1, "priority": 1},
+            {"id": 4, "content": "Under low", "parent_id": 2},
+            {"id": 5, "content": "Under urgent", "parent_id": 3},
+            {"id": 6, "content": "Archived", "parent_id": 3, "tags": {"deleted": "deleted"}}]
+    service = CheckvistService(make_client({100: rows}))
+
+    roomy = await service.get_tree_within_budget(100, 10_000)
+    assert [(task["id"], level, folded) for task, level, folded in roomy["items"]] == [
+        (1, 0, 0), (2, 1, 0), (4, 2, 0), (3, 1, 0), (5, 2, 0)]
+
+    # Room for the second level but only one third-level expansion: the !1 branch wins
+    tight = await service.get_tree_within_budget(100, roomy["chars"] - 5)
+    assert [(task["id"], folded) for task, _, folded in tight["items"]] == [(1, 0), (2, 1), (3, 0), (5, 0)]
+    assert tight["chars"] <= roomy["chars"] - 5
+
+    only_root = await service.get_tree_within_budget(100, 40)
+    assert [(task["id"], folded) for task, _, folded in only_root["items"]] == [(1, 2)]
+    assert only_root["omitted"] == 0
+
+    with pytest.raises(ValueError):
+        await service.get_tree_within_budget(100, 100, expand_by="size")
+
+
+@pytest.mark.asyncio
+async def test_get_changes_diffs_against_stored_snapshots(tmp_path):
+    rows = [{"id": 1, "content": "A"}, {"id": 2, "content": "B"}]
+    client = make_client({100: rows})
+    service = CheckvistService(client, mirror_path=str(tmp_path / "cache.db"))
+
+    first = await service.get_changes(100)
+    assert first["changes"] is None
+    # Unchanged list version: the same token is handed out again
+    assert (await service.get_changes(100))["since"] == first["since"]
+
+    rows[1]["status"] = 1
+    rows.append({"id": 3, "content": "C", "parent_id": 1})
+    service._drop_list(100)
+    second = await service.get_changes(100, since=first["since"])
+    assert [t["id"] for t in second["changes"]["added"]] == [3]
+    assert [t["id"] for t in second["changes"]["closed"]] == [2]
+    assert second["since"] != first["since"]
+
+    # Tokens survive a restart through the mirror
+    service.close()
+    restarted = CheckvistService(client, mirror_path=str(tmp_path / "cache.db"))
+    again = await restarted.get_changes(100, since=first["since"])
+    assert [t["id"] for t in again["changes"]["added"]] == [3]
+
+    with pytest.raises(ValueError):
+        await restarted.get_changes(100, since="nope")
+
+
+@pytest.mark.asyncio
+async def test_search_tasks_is_answered_locally_once_every_list_is_cached():
+    from src.models import Checklist
+    client = make_client({
+        1: [{"id": 10, "content": "Write report"}, {"id": 11, "content": "Report draft", "parent_id": 10}],
+        2: [{"id": 20, "content": "Unrelated"}],
+    })
+    client.get_checklists.return_value = [Checklist(id=1, name="Work"), Checklist(id=2, name="Home")]
+    client.search_global.return_value = []
+    service = CheckvistService(client)
+
+    await service.search_tasks("report")  # cold: upstream, then the local fallback caches both lists
+    assert service.search_stats == {"local": 0, "upstream": 1}
+    assert client.search_global.await_count == 1
+
+    results = await service.search_tasks("report")
+    assert service.search_stats["local"] == 1
+    assert client.search_global.await_count == 1
+    assert [(r["id"], r["list_name"]) for r in results] == [(10, "Work"), (11, "Work")]
+    assert results[1]["breadcrumb"] == "Write report > Report draft"
+
+    # Write-through patches reach the index without a download
+    client.update_task.return_value = Task(id=20, content="Report taxes", checklist_id=2)
+    await service.update_task(2, 20, content="Report taxes")
+    assert [r["id"] for r in await service.search_tasks("report")] == [10, 11, 20]
+    assert client.get_tasks.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_search_tasks_asks_upstream_only_for_lists_it_cannot_answer():
+    from src.models import Checklist
+    client = make_client({
+        1: [{"id": 10, "content": "Report A"}],
+        2: [{"id": 20, "content": "Report B"}],
+        3: [{"id": 30, "content": "Report C"}, {"id": 31, "content": "x"}, {"id": 32, "content": "y"}],
+    })
+    client.get_checklists.return_value = [Checklist(id=l_id, name=f"L{l_id}") for l_id in (1, 2, 3)]
+    client.search_global.return_value = [
+        Task(id=10, content="Report A (upstream copy)", checklist_id=1),
+        Task(id=20, content="Report B", checklist_id=2),
+        Task(id=30, content="Report C", checklist_id=3),
+    ]
+    service = CheckvistService(client)
+    service.search_inline_tasks = 2  # list 3 is "large": indexed in the background
+    await service.get_tasks(1)
+    await service.get_tasks(3)
+
+    results = await service.search_tasks("report")
+    assert [(r["id"], r["content"]) for r in results] == [(10, "Report A"), (20, "Report B"), (30, "Report C")]
+    assert service.search_stats == {"local": 0, "upstream": 1}
+    assert 1 in service.search_index and 3 not in service.search_index
+
+    await service.wait_for_refreshes()
+    assert 3 in service.search_index
+    # List 2 was cached while enriching the upstream hit: every list is answered locally now
+    assert [r["id"] for r in await service.search_tasks("report")] == [10, 20, 30]
+    assert service.search_stats == {"local": 1, "upstream": 1}
+    assert client.search_global.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_evicted_lists_leave_the_search_index():
+    import gc
+    import weakref
+    from src.models import Checklist
+    client = make_client({
+        1: [{"id": 10 + i, "content": f"Task {i}"} for i in range(200)],
+        2: [{"id": 1000 + i, "content": f"Item {i}"} for i in range(200)],
+        3: [{"id": 5000, "content": "Other"}],
+    })
+    client.get_checklists.return_value = [Checklist(id=1, name="A"), Checklist(id=2, name="B")]
+    service = CheckvistService(client, content_cache_size=2)
+    await service.get_tasks(1)
+    await service.get_tasks(2)
+    await service.search_tasks("task")
+    assert len(service.search_index) == 400
+    evicted = weakref.ref(service.list_content_cache.peek(1))
+
+    await service.get_tasks(3)  # evicts list 1
+    gc.collect()
+    assert evicted() is None
+    assert 1 not in service.search_index and len(service.search_index) == 200
+
+    await service.invalidate_cache()
+    assert len(service.search_index) == 0
@@ -0,0 +1,42 @@
+import time
+from src.trigram import TrigramIndex
+
+
+def test_find_verifies_candidates_per_field():
+    texts = {1: ["Onboarding checklist", "hr"], 2: ["Board meeting"], 3: ["onboard", "ing"]}
+    index = TrigramIndex()
+    for key, fields in texts.items():
+        index.add(key, fields)
+
+    assert index.find("BOARD", texts.get) == {1, 2, 3}
+    assert index.find("boarding", texts.get) == {1}  # "onboard" + "ing" in separate fields is no match
+    assert index.find("hr", texts.get) == set()  # shorter than a trigram: left to the caller
+    assert index.find("zzz", texts.get) == set()
+
+
+def test_stale_keys_are_skipped_then_compacted():
+    texts = {1: ["alpha"]}
+    index = TrigramIndex()
+    index.add(1, texts[1])
+    texts = {2: ["alphabet"]}  # changed text: new key, the old one is no longer live
+    index.add(2, texts[2])
+    assert index.find("alp", texts.get) == {2}
+
+    index.compact(texts)
+    assert list(index.postings["alp"]) == [2]
+    index.compact({})
+    assert index.postings == {} and index.nbytes() == 0
+
+
+def test_substring_search_over_100k_tasks_is_fast():
+    texts = {i: [f"task {i} about topic {i % 997}", f"tag{i % 13}"] for i in range(100_000)}
+    texts[100_000] = ["Q3 report for onboarding"]
+    index = TrigramIndex()
+    for key, fields in texts.items():
+        index.add(key, fields)
+
+    started = time.perf_counter()
+    assert index.find("q3 rep", texts.get) == {100_000}
+    assert index.find("onboard", texts.get) == {100_000}
+    assert time.perf_counter() - started < 0.05
+    assert index.nbytes() < 100_000 * 40 * 8